@@ -0,0 +1,12 @@
+from django.urls import path
+
+from .async_views import card_detail, card_list, profile_detail, team_list
+
+# Mounted ahead of api/urls.py by backend/asgi_urls.py; the names match the
+# DRF routes they stand in for.
+urlpatterns = [
+    path('profile/', profile_detail, name='profile-list'),
+    path('teams/', team_list, name='team-list'),
+    path('cards/', card_list, name='card-list'),
+    path('cards/<int:pk>/', card_detail, name='card-detail'),
+]
@@ -0,0 +1,172 @@
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import resolve
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from .conditional import make_etag, not_modified, set_validators
+from .firebase_auth import aauthenticate_token
+from .models import Card, Team, UserProfile
+from .presence import presence_store
+from .roster import aroster_validator, arosters
+from .serializers import ProfileReadSerializer
+from .versioning import cache_is_shared, team_versions
+from . import board_cache, db_routing, membership, profiling, projections
+
+logger = logging.getLogger(__name__)
+
+# Async versions of the hottest reads (card list and detail, team list,
+# profile), served under ASGI through ASGI_URLCONF (backend/asgi.py). They
+# answer exactly like the DRF views: the same projections, validators and
+# cache entries, with queries on the async ORM. Cache calls stay synchronous,
+# as the cache answers faster than a hop to a thread would take.
+#
+# Everything else on the same paths (other methods, paginated card lists,
+# the browsable API) is handed to the DRF view.
+
+
+async def _drf_view(request, *args, **kwargs):
+    match = resolve(request.path_info, urlconf=settings.ROOT_URLCONF)
+    return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+
+
+def _render(data, status=200):
+    with profiling.phase('render'):
+        response = HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+    response['Vary'] = 'Accept'
+    return response
+
+
+async def _authenticate(request):
+    # Same checks and messages as FirebaseAuthentication (authentication and permission classes)
+    auth_header = request.META.get('HTTP_AUTHORIZATION')
+    if not auth_header:
+        raise AuthenticationFailed('No authorization header')
+    if not auth_header.startswith('Bearer '):
+        raise AuthenticationFailed('Invalid token format. Use Bearer token.')
+    token = auth_header.split(' ')[1]
+    if not token:
+        raise AuthenticationFailed('No token provided')
+    try:
+        with profiling.phase('auth'):
+            return await aauthenticate_token(token)
+    except AuthenticationFailed:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error during authentication: {str(e)}")
+        raise AuthenticationFailed(f'Authentication error: {str(e)}')
+
+
+def async_read(*fallback_params):
+    """
+    Serves GET requests with the decorated coroutine once the caller is
+    authenticated, with reads routed like a DRF viewset's (api/db_routing.py).
+    Other methods, and requests carrying any of ``fallback_params``, go to
+    the DRF view.
+    """
+    def decorator(handler):
+        @csrf_exempt
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if (
+                request.method != 'GET'
+                or 'text/html' in request.META.get('HTTP_ACCEPT', '')
+                or any(param in request.GET for param in fallback_params)
+            ):
+                return await _drf_view(request, *args, **kwargs)
+            user = None
+            token = db_routing.begin_request()
+            try:
+                try:
+                    user = request.user = await _authenticate(request)
+                except AuthenticationFailed as e:
+                    logger.warning(f"Authentication failed: {str(e)}")
+                    # DRF answers 403 as FirebaseAuthentication sends no WWW-Authenticate challenge
+                    return _render({"detail": str(e.detail)}, status=403)
+                db_routing.route_reads(request)
+                return await handler(request, user, *args, **kwargs)
+            finally:
+                db_routing.end_request(token, user)
+        return view
+    return decorator
+
+
+@async_read()
+async def profile_detail(request, user):
+    try:
+        profile = await UserProfile.objects.aget(user=user)
+    except UserProfile.DoesNotExist:
+        logger.debug(f"Creating new profile for user: {user.username}")
+        profile = await UserProfile.objects.acreate(
+            user=user,
+            name=user.first_name or f"User_{user.username[:8]}",
+            role='Team Member',
+            position='',
+            is_active=True
+        )
+    # The serializer reads user.email; this is the same row
+    profile.user = user
+    profile.last_login = presence_store.touch(profile.id)
+    etag = make_etag('profile', profile.id, profile.updated_at, profile.profile_pic.name, user.email)
+    response = not_modified(request, etag, profile.updated_at, response_class=HttpResponse)
+    if response is None:
+        data = ProfileReadSerializer(profile, context={'request': request}).data
+        response = set_validators(_render(data), etag, profile.updated_at)
+    return response
+
+
+@async_read()
+async def team_list(request, user):
+    team_ids = sorted(await membership.ateam_ids_for_user(user))
+    # Without a shared cache the list is always sent in full, as in TeamViewSet.list
+    etag = make_etag('teams', team_ids, sorted(team_versions(team_ids).items())) if cache_is_shared() else None
+    response = not_modified(request, etag, response_class=HttpResponse) if etag else None
+    if response is not None:
+        return response
+    teams = [team async for team in projections.team_values(Team.objects.filter(id__in=team_ids))]
+    data = projections.team_rows(teams, await arosters([team['id'] for team in teams]))
+    return set_validators(_render(data), etag) if etag else _render(data)
+
+
+@async_read('cursor', 'page_size')
+async def card_list(request, user):
+    team_id = request.GET.get('team_id')
+    if not team_id:
+        logger.warning("No team_id provided, returning empty list")
+        return _render([])
+    if not await membership.ais_member(user, team_id):
+        logger.warning(f"User {user.username} is not a member of team {team_id}")
+        return _render([])
+    team_id = int(team_id)
+    snapshot = await board_cache.aboard_snapshot(team_id)
+    if snapshot is None:
+        snapshot = await board_cache.aboard_state(team_id)
+    etag = make_etag(
+        'cards', team_id, snapshot.count, snapshot.last, await aroster_validator(team_id), request.get_full_path()
+    )
+    response = not_modified(request, etag, snapshot.last, response_class=HttpResponse)
+    if response is not None:
+        return response
+    if snapshot.body is not None:
+        response = HttpResponse(snapshot.body, content_type='application/json')
+        response['Vary'] = 'Accept'
+    else:
+        cards = [card async for card in projections.card_values(Card.objects.filter(team_id=team_id))]
+        response = _render(projections.card_rows(cards))
+    return set_validators(response, etag, snapshot.last)
+
+
+@async_read()
+async def card_detail(request, user, pk):
+    card = await projections.card_values(Card.objects.filter(pk=pk)).afirst()
+    if card is None:
+        return _render({"detail": "No Card matches the given query."}, status=404)
+    if not await membership.ais_member(user, card['team_id']):
+        logger.warning(f"User {user.username} is not a member of team {card['team_id']}")
+        return _render({"detail": "You are not a member of this team"}, status=403)
+    return _render(projections.card_row(card))
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from rest_framework.renderers import JSONRenderer
+
+from .db_routing import primary_reads
+from .metrics import HitCounter
+from .models import Card
+from .projections import card_rows, card_values
+from .versioning import BOARD, TEAM, cache_is_shared, team_version
+
+logger = logging.getLogger(__name__)
+
+# A team's plain card list (``GET /api/cards/?team_id=``) rendered to JSON
+# bytes, cached under the team version (member renames show up as
+# assigned_to_name) and the board version (every card write), so a hit costs
+# one cache read: no query and no serialization. The entry also carries the
+# card count and newest updated_at the list's ETag is made of.
+#
+# Snapshots are only used with a shared cache (versioning.cache_is_shared):
+# with a per-process one, a card write in another worker would leave this
+# worker serving the old board. Callers then fall back to ``board_state``,
+# one aggregate query per request.
+#
+# After a version bump the first request rebuilds the entry while concurrent
+# ones wait for it (single flight, through cache.add), so a crowd of viewers
+# reloading a board after a change renders it once. Waiters give up after
+# BOARD_SNAPSHOT_WAIT_TIMEOUT and render the list themselves.
+
+BoardSnapshot = namedtuple('BoardSnapshot', ['body', 'count', 'last'])
+
+board_snapshot_stats = HitCounter('board_snapshot')
+
+
+def _snapshot_key(team_id):
+    return f"team:board-json:{team_id}:{team_version(team_id, TEAM)}:{team_version(team_id, BOARD)}"
+
+
+def _state_query(team_id):
+    # Row count and newest updated_at change with every create/update/delete
+    return Card.objects.filter(team_id=team_id).aggregate(count=Count('id'), last=Max('updated_at'))
+
+
+def board_state(team_id):
+    """
+    The list's validators without a body, read per request.
+    """
+    state = _state_query(team_id)
+    return BoardSnapshot(None, state['count'], state['last'])
+
+
+async def aboard_state(team_id):
+    state = await Card.objects.filter(team_id=team_id).aaggregate(count=Count('id'), last=Max('updated_at'))
+    return BoardSnapshot(None, state['count'], state['last'])
+
+
+def render_snapshot(team_id):
+    """
+    Renders the team's cards as CardViewSet.list does. Boards of more than
+    BOARD_SNAPSHOT_MAX_CARDS cards keep only their validators (``body`` is
+    ``None``) and are not rendered, so they are rendered once per request.
+    """
+    # Read from the primary: the entry is cached under the versions just bumped
+    with primary_reads():
+        state = _state_query(team_id)
+        if state['count'] > settings.BOARD_SNAPSHOT_MAX_CARDS:
+            logger.info(f"Card list of team {team_id} has {state['count']} cards, too many to cache")
+            body = None
+        else:
+            body = JSONRenderer().render(card_rows(card_values(Card.objects.filter(team_id=team_id))))
+    return BoardSnapshot(body, state['count'], state['last'])
+
+
+def cached_snapshot(team_id):
+    """
+    The cached snapshot of the team's current versions, or ``None``.
+    """
+    if not cache_is_shared():
+        return None
+    return cache.get(_snapshot_key(team_id))
+
+
+def _rebuild(team_id, key):
+    # Someone else may have finished between our miss and taking the lock
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = render_snapshot(team_id)
+        cache.set(key, snapshot, settings.BOARD_SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def _release(lock_key, token):
+    # Only our own lock: an expired one may have been taken by another request
+    # since. (get then delete is not atomic, but the window is a cache round trip.)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _lookup(team_id):
+    key = _snapshot_key(team_id)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        board_snapshot_stats.hit()
+    else:
+        board_snapshot_stats.miss()
+    return key, snapshot
+
+
+def board_snapshot(team_id):
+    """
+    The team's snapshot, rebuilt on a miss by one request at a time; ``None``
+    without a shared cache or when waiting for another rebuild timed out.
+    """
+    if not cache_is_shared():
+        return None
+    key, snapshot = _lookup(team_id)
+    if snapshot is not None:
+        return snapshot
+    lock_key, token = f"{key}:lock", uuid.uuid4().hex
+    deadline = time.monotonic() + settings.BOARD_SNAPSHOT_WAIT_TIMEOUT
+    # The lock expires, so a crashed rebuild only delays the others
+    while not cache.add(lock_key, token, settings.BOARD_SNAPSHOT_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            logger.info(f"Gave up waiting for the card list of team {team_id} to be rebuilt")
+            return None
+        time.sleep(settings.BOARD_SNAPSHOT_POLL_INTERVAL)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return snapshot
+    try:
+        return _rebuild(team_id, key)
+    finally:
+        _release(lock_key, token)
+
+
+async def aboard_snapshot(team_id):
+    """
+    Async ``board_snapshot``: waiting for another rebuild holds no thread.
+    """
+    if not cache_is_shared():
+        return None
+    key, snapshot = _lookup(team_id)
+    if snapshot is not None:
+        return snapshot
+    lock_key, token = f"{key}:lock", uuid.uuid4().hex
+    deadline = time.monotonic() + settings.BOARD_SNAPSHOT_WAIT_TIMEOUT
+    while not cache.add(lock_key, token, settings.BOARD_SNAPSHOT_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            logger.info(f"Gave up waiting for the card list of team {team_id} to be rebuilt")
+            return None
+        await asyncio.sleep(settings.BOARD_SNAPSHOT_POLL_INTERVAL)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return snapshot
+    try:
+        return await sync_to_async(_rebuild)(team_id, key)
+    finally:
+        _release(lock_key, token)
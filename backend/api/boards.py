@@ -0,0 +1,282 @@
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Card, Team, TeamMember, UserProfile, WorkDay
+from .versioning import bump_team_versions
+from . import burndown, membership, worktime
+
+logger = logging.getLogger(__name__)
+
+# A board export is NDJSON: one {"type": ...} object per line, in this order:
+#   header, team, member*, card*, workday*
+# Profiles are referred to by their id in the source instance; on import they
+# are matched to users of the target instance by Firebase uid.
+FORMAT_VERSION = 1
+
+CARD_FIELDS = (
+    'id', 'title', 'column', 'priority', 'assigned_to_id', 'updated_by_id', 'start_date', 'deadline',
+    'progress', 'sprint_start', 'sprint_finish',
+)
+WORKDAY_FIELDS = ('id', 'user_profile_id', 'start_time', 'end_time', 'working_hours', 'duration_seconds')
+
+
+class BoardImportError(Exception):
+    pass
+
+
+def _line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_board(team, include_workdays=False):
+    """
+    Yields the NDJSON lines of a team's board. Cards and work days are read
+    with ``.iterator()`` so the export runs in constant memory.
+    """
+    chunk_size = settings.BOARD_TRANSFER_BATCH_SIZE
+    yield _line({'type': 'header', 'version': FORMAT_VERSION, 'exported_at': timezone.now()})
+    yield _line({'type': 'team', 'id': team.id, 'name': team.name, 'code': team.code})
+    members = TeamMember.objects.filter(team=team).order_by('id').values_list(
+        'user_profile_id', 'user_profile__user__username', 'user_profile__user__email', 'user_profile__name',
+        'user_profile__role', 'user_profile__position', 'member_name', 'working_hours',
+    )
+    member_ids = []
+    for profile_id, firebase_uid, email, name, role, position, member_name, working_hours in members.iterator(
+        chunk_size=chunk_size
+    ):
+        member_ids.append(profile_id)
+        yield _line({
+            'type': 'member', 'profile_id': profile_id, 'firebase_uid': firebase_uid, 'email': email,
+            'name': name, 'role': role, 'position': position, 'member_name': member_name,
+            'working_hours': working_hours,
+        })
+    cards = Card.objects.filter(team=team).order_by('id').values_list(*CARD_FIELDS)
+    for values in cards.iterator(chunk_size=chunk_size):
+        yield _line({'type': 'card', **dict(zip(CARD_FIELDS, values))})
+    if include_workdays:
+        workdays = WorkDay.objects.filter(user_profile_id__in=member_ids).order_by('id').values_list(*WORKDAY_FIELDS)
+        for values in workdays.iterator(chunk_size=chunk_size):
+            yield _line({'type': 'workday', **dict(zip(WORKDAY_FIELDS, values))})
+
+
+class BoardImporter:
+    """
+    Recreates an exported board with batched ``bulk_create``: the team and its
+    members in one transaction, then one transaction per batch of cards or
+    work days. Source ids are remapped to the new rows; cards keep no link to
+    members that are missing from the export. Card timestamps are set to the
+    import time; ended work days are added to the users' totals and rollups.
+
+    With ``manager`` (imports over HTTP) the importing Project Manager joins
+    the team, members must already belong to one of the manager's teams, no
+    user is created and work days are refused. Only the import_board command
+    creates users and imports work days.
+
+    ``progress(kind, count)`` is called after every committed batch.
+    """
+
+    def __init__(self, code=None, batch_size=None, progress=None, manager=None):
+        self.code = code
+        self.batch_size = batch_size or settings.BOARD_TRANSFER_BATCH_SIZE
+        self.progress = progress or (lambda kind, count: None)
+        self.manager = manager
+        self.team = None
+        self.profiles = {}
+        self.counts = {'members': 0, 'cards': 0, 'workdays': 0}
+        self._members = []
+        self._batch = []
+        self._batch_kind = None
+
+    def run(self, lines):
+        for number, raw in enumerate(lines, start=1):
+            if isinstance(raw, bytes):
+                raw = raw.decode('utf-8')
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                raise BoardImportError(f"Line {number} is not valid JSON")
+            self._handle(number, record)
+        if self.team is None:
+            # A board without cards or work days
+            self._create_team()
+        self._flush()
+        self._finish()
+        return {'team': self.team.id, 'code': self.team.code, **self.counts}
+
+    def _handle(self, number, record):
+        kind = record.get('type')
+        if kind == 'header':
+            if record.get('version') != FORMAT_VERSION:
+                raise BoardImportError(f"Unsupported export version: {record.get('version')}")
+        elif kind == 'team':
+            if self.team is not None:
+                raise BoardImportError(f"Line {number}: an export holds exactly one team")
+            self.team_record = record
+        elif kind == 'member':
+            if not record.get('firebase_uid'):
+                raise BoardImportError(f"Line {number}: a member needs a firebase_uid")
+            if record.get('role') and record['role'] not in dict(UserProfile.ROLE_CHOICES):
+                raise BoardImportError(f"Line {number}: unknown role {record['role']!r}")
+            self._members.append(record)
+        elif kind in ('card', 'workday'):
+            if kind == 'workday' and self.manager is not None:
+                raise BoardImportError(f"Line {number}: work days can only be imported with the import_board command")
+            if self.team is None:
+                self._create_team()
+            if kind != self._batch_kind:
+                self._flush()
+                self._batch_kind = kind
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+        else:
+            raise BoardImportError(f"Line {number}: unknown record type {kind!r}")
+
+    def _create_team(self):
+        if not hasattr(self, 'team_record'):
+            raise BoardImportError("The export contains no team before its cards and work days")
+        code = self.code or self.team_record['code']
+        if Team.objects.filter(code=code).exists():
+            raise BoardImportError(f"Team code {code} is already in use; pass a new code")
+        with transaction.atomic():
+            self.team = Team.objects.create(name=self.team_record['name'], code=code)
+            if self.manager is not None:
+                self._map_managed_members()
+            else:
+                self._create_users()
+            self._create_members()
+        # Imported work days are rolled up to the members' teams, this one included
+        membership.invalidate_profiles(self.profiles.values())
+        self.progress('members', self.counts['members'])
+
+    def _map_managed_members(self):
+        # Over HTTP a file may only name people the manager already works with
+        known = dict(
+            TeamMember.objects.filter(team_id__in=membership.team_ids_for_profile(self.manager.id)).values_list(
+                'user_profile__user__username', 'user_profile_id'
+            )
+        )
+        for record in self._members:
+            if record['firebase_uid'] not in known:
+                raise BoardImportError(f"Member {record['firebase_uid']} is not in any of your teams")
+            self.profiles[record['profile_id']] = known[record['firebase_uid']]
+
+    def _create_users(self):
+        uids = {record['firebase_uid'] for record in self._members}
+        users = {user.username: user for user in User.objects.filter(username__in=uids)}
+        new_users = [
+            User(username=record['firebase_uid'], email=record.get('email') or '', first_name=record.get('name') or '')
+            for record in self._members if record['firebase_uid'] not in users
+        ]
+        if new_users:
+            # Re-read rather than trust bulk_create: MySQL does not return the new ids
+            User.objects.bulk_create(new_users, batch_size=self.batch_size)
+            users = {user.username: user for user in User.objects.filter(username__in=uids)}
+        profiles = {
+            profile.user_id: profile
+            for profile in UserProfile.objects.filter(user_id__in=[user.id for user in users.values()])
+        }
+        by_uid = {record['firebase_uid']: record for record in self._members}
+        new_profiles = [
+            UserProfile(
+                user=user, name=by_uid[uid].get('name') or f"User_{uid[:8]}",
+                role=by_uid[uid].get('role') or 'Team Member', position=by_uid[uid].get('position') or '',
+            )
+            for uid, user in users.items() if user.id not in profiles
+        ]
+        if new_profiles:
+            UserProfile.objects.bulk_create(new_profiles, batch_size=self.batch_size)
+            profiles = {
+                profile.user_id: profile
+                for profile in UserProfile.objects.filter(user_id__in=[user.id for user in users.values()])
+            }
+
+        for record in self._members:
+            self.profiles[record['profile_id']] = profiles[users[record['firebase_uid']].id].id
+
+    def _create_members(self):
+        members = [
+            TeamMember(
+                team=self.team, user_profile_id=self.profiles[record['profile_id']],
+                member_name=record.get('member_name') or '', working_hours=record.get('working_hours') or 0,
+            )
+            for record in self._members
+        ]
+        if self.manager is not None and self.manager.id not in self.profiles.values():
+            members.append(TeamMember(team=self.team, user_profile=self.manager, member_name=self.manager.name))
+        TeamMember.objects.bulk_create(members, batch_size=self.batch_size)
+        self.counts['members'] = len(members)
+
+    def _flush(self):
+        if not self._batch:
+            return
+        if self._batch_kind == 'card':
+            objects = [self._card(record) for record in self._batch]
+            with transaction.atomic():
+                Card.objects.bulk_create(objects, batch_size=self.batch_size)
+            self.counts['cards'] += len(objects)
+        else:
+            objects = [workday for workday in map(self._workday, self._batch) if workday is not None]
+            ended = [workday for workday in objects if workday.end_time is not None]
+            with transaction.atomic():
+                WorkDay.objects.bulk_create(ended, batch_size=self.batch_size)
+                worktime.add_workdays(ended)
+                inserted = len(ended)
+                for workday in objects:
+                    if workday.end_time is not None:
+                        continue
+                    # A user who already has an open work day keeps it; the imported one is dropped
+                    try:
+                        with transaction.atomic():
+                            workday.save()
+                        inserted += 1
+                    except IntegrityError:
+                        logger.info(f"Skipped an open work day of profile {workday.user_profile_id}: one is already open")
+            self.counts['workdays'] += inserted
+        self.progress(self._batch_kind + 's', self.counts[self._batch_kind + 's'])
+        self._batch = []
+
+    def _card(self, record):
+        return Card(
+            team=self.team,
+            title=record['title'],
+            column=record['column'],
+            priority=record['priority'],
+            assigned_to_id=self.profiles.get(record.get('assigned_to_id')),
+            updated_by_id=self.profiles.get(record.get('updated_by_id')),
+            start_date=parse_date(record['start_date']) if record.get('start_date') else None,
+            deadline=parse_date(record['deadline']) if record.get('deadline') else None,
+            progress=record.get('progress') or 0,
+            sprint_start=parse_datetime(record['sprint_start']) if record.get('sprint_start') else None,
+            sprint_finish=parse_datetime(record['sprint_finish']) if record.get('sprint_finish') else None,
+        )
+
+    def _workday(self, record):
+        profile_id = self.profiles.get(record['user_profile_id'])
+        if profile_id is None:
+            return None
+        workday = WorkDay(user_profile_id=profile_id, start_time=parse_datetime(record['start_time']))
+        if record.get('end_time'):
+            # Recomputed as ending a work day does, so the totals match the rows
+            workday.end_time = parse_datetime(record['end_time'])
+            workday.duration_seconds = worktime.duration_between(workday.start_time, workday.end_time)
+            workday.working_hours = worktime.format_duration(workday.duration_seconds)
+        return workday
+
+    def _finish(self):
+        # bulk_create skips the model signals, so refresh what they would have
+        membership.invalidate_profiles(self.profiles.values())
+        if self.manager is not None:
+            membership.invalidate_profile(self.manager.id)
+        bump_team_versions([self.team.id])
+        burndown.snapshot_team(self.team.id)
+        logger.info(f"Imported team {self.team.id} ({self.team.code}): {self.counts}")
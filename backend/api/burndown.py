@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import BurndownSnapshot, Card
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = [column for column, _ in Card.COLUMN_CHOICES]
+
+
+def snapshot_team(team_id, date=None):
+    """
+    Writes the full per-column state of a team's board as the snapshot for ``date``
+    (today by default), replacing whatever was recorded for that day.
+    """
+    date = date or timezone.localdate()
+    totals = {
+        row['column']: row
+        for row in Card.objects.filter(team_id=team_id).values('column').annotate(
+            cards=Count('id'), progress=Sum('progress')
+        )
+    }
+    BurndownSnapshot.objects.bulk_create(
+        [
+            BurndownSnapshot(
+                team_id=team_id,
+                date=date,
+                column=column,
+                card_count=totals.get(column, {}).get('cards') or 0,
+                progress_total=totals.get(column, {}).get('progress') or 0,
+            )
+            for column in COLUMNS
+        ],
+        update_conflicts=True,
+        unique_fields=['team', 'date', 'column'],
+        update_fields=['card_count', 'progress_total'],
+    )
+    logger.debug(f"Snapshotted burndown for team {team_id} on {date}")
+
+
+def apply_card_changes(team_id, changes):
+    """
+    Applies card changes to today's snapshot of a team as per-column deltas.
+
+    ``changes`` is a list of ``(old, new)`` pairs where each side is a
+    ``(column, progress)`` tuple, or ``None`` when the card did not exist before /
+    no longer exists. The first change of the day seeds the day from the board
+    itself, which already includes these changes.
+    """
+    today = timezone.localdate()
+    if not BurndownSnapshot.objects.filter(team_id=team_id, date=today).exists():
+        snapshot_team(team_id, today)
+        return
+    deltas = {}
+    for old, new in changes:
+        if old is not None:
+            delta = deltas.setdefault(old[0], [0, 0])
+            delta[0] -= 1
+            delta[1] -= old[1]
+        if new is not None:
+            delta = deltas.setdefault(new[0], [0, 0])
+            delta[0] += 1
+            delta[1] += new[1]
+    today_rows = BurndownSnapshot.objects.filter(team_id=team_id, date=today)
+    for column, (cards, progress) in deltas.items():
+        if cards or progress:
+            today_rows.filter(column=column).update(
+                card_count=F('card_count') + cards, progress_total=F('progress_total') + progress
+            )
+
+
+def default_window(team_id):
+    """
+    The team's sprint window (earliest sprint start to latest sprint finish),
+    falling back to the last two weeks when no card has sprint dates.
+    """
+    window = Card.objects.filter(team_id=team_id).aggregate(
+        start=Min('sprint_start'), finish=Max('sprint_finish')
+    )
+    if window['start'] and window['finish'] and window['start'] <= window['finish']:
+        return timezone.localtime(window['start']).date(), timezone.localtime(window['finish']).date()
+    today = timezone.localdate()
+    return today - timedelta(days=13), today
+
+
+def burndown_series(team_id, start, end):
+    """
+    One entry per day in ``[start, end]`` read from a single query. Each
+    column starts from its last snapshot before ``start`` and days without a
+    snapshot carry the previous day forward; days before the team's first
+    snapshot have no data.
+    """
+    snapshots = BurndownSnapshot.objects.filter(team_id=team_id)
+    earlier = snapshots.filter(date__lt=start)
+    latest_earlier = earlier.filter(column=OuterRef('column')).order_by('-date').values('date')[:1]
+    seed = {}
+    by_date = {}
+    for row in snapshots.filter(
+        Q(date__range=(start, end)) | Q(date__lt=start, date=Subquery(latest_earlier))
+    ).values('date', 'column', 'card_count', 'progress_total'):
+        value = {'cards': row['card_count'], 'progress': row['progress_total']}
+        if row['date'] < start:
+            seed[row['column']] = value
+        else:
+            by_date.setdefault(row['date'], {})[row['column']] = value
+
+    days = []
+    current = seed or None
+    today = timezone.localdate()
+    day = start
+    while day <= end:
+        if day in by_date:
+            current = by_date[day]
+        if current is None or day > today:
+            days.append({'date': day, 'columns': None, 'total_cards': None, 'remaining_work': None})
+        else:
+            columns = {column: current.get(column, {'cards': 0, 'progress': 0}) for column in COLUMNS}
+            days.append({
+                'date': day,
+                'columns': columns,
+                'total_cards': sum(value['cards'] for value in columns.values()),
+                # Same measure as the chart: 100 points per card minus its progress
+                'remaining_work': sum(value['cards'] * 100 - value['progress'] for value in columns.values()),
+            })
+        day += timedelta(days=1)
+    return days
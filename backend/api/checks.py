@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core import checks
+
+from .db_routing import configured_replica_alias
+from .versioning import cache_is_shared
+
+
+@checks.register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Warns when a production deployment runs on a per-process cache.
+    """
+    if settings.DEBUG or cache_is_shared():
+        return []
+    return [checks.Warning(
+        "The default cache is per process: card lists are rendered on every request instead of "
+        "being served from board snapshots, team lists are never answered with 304, and rosters, "
+        "facets and team memberships are only cached for PROCESS_CACHE_TIMEOUT seconds.",
+        hint="Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached, or set CACHE_SHARED=true "
+             "when running a single worker process.",
+        id='api.W001',
+    )]
+
+
+@checks.register()
+def replica_cache_check(app_configs, **kwargs):
+    """
+    Warns when a read replica is configured but unused for want of a shared cache.
+    """
+    if configured_replica_alias() is None or cache_is_shared():
+        return []
+    return [checks.Warning(
+        f"The read replica '{configured_replica_alias()}' is not used: the default cache is per "
+        "process, so workers cannot tell which users wrote within REPLICA_STICKY_SECONDS.",
+        hint="Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached, or set CACHE_SHARED=true "
+             "when running a single worker process.",
+        id='api.W002',
+    )]
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import HitCounter
+
+logger = logging.getLogger(__name__)
+
+# Conditional GETs answered with 304 count as hits, full responses as misses
+not_modified_stats = HitCounter('conditional_get')
+
+# Log the 304 rate every this many conditional requests
+REPORT_EVERY = 1000
+
+
+def make_etag(*parts):
+    """
+    Weak ETag over the given validator parts. Weak because the parts describe
+    what a response contains, not its exact bytes.
+    """
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _matches(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # Weak comparison: W/"x" and "x" match
+        tags = parse_etags(if_none_match)
+        return '*' in tags or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in tags]
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    last_modified = _usable_last_modified(last_modified)
+    if if_modified_since and last_modified is not None:
+        since = parse_http_date_safe(if_modified_since)
+        return since is not None and int(last_modified.timestamp()) <= since
+    return False
+
+
+def not_modified(request, etag, last_modified=None, response_class=Response):
+    """
+    Returns a 304 response when the request's validators still match, or
+    ``None`` when the caller has to build the full response. Views outside
+    DRF pass ``response_class=HttpResponse``.
+    """
+    if _matches(request, etag, last_modified):
+        not_modified_stats.hit()
+        response = set_validators(response_class(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+    else:
+        not_modified_stats.miss()
+        response = None
+    snapshot = not_modified_stats.snapshot()
+    total = snapshot['hits'] + snapshot['misses']
+    if total % REPORT_EVERY == 0:
+        logger.info(f"Conditional GET: {snapshot['hit_rate']:.1%} of {total} requests answered with 304")
+    return response
+
+
+def _usable_last_modified(last_modified):
+    # Last-Modified has one-second resolution: a timestamp from the current
+    # second could be followed by another change in the same second that an
+    # If-Modified-Since check would miss
+    if last_modified is None or timezone.now() - last_modified < timedelta(seconds=1):
+        return None
+    return last_modified
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    last_modified = _usable_last_modified(last_modified)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Cache, but always revalidate: the data changes whenever a teammate edits the board
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .versioning import cache_is_shared
+
+# Read-replica routing. Writes always go to the primary ("default"). Reads go
+# to REPLICA_DATABASE only inside a safe-method viewset action (see
+# ReplicaReadMixin), and stay on the primary:
+#   - for the rest of a request once it has written anything, and
+#   - for REPLICA_STICKY_SECONDS after a user's last write, so a client
+#     reloading right after a change does not read a lagging replica.
+# Outside requests (management commands, background threads) every query
+# uses the primary. The marker of a user's last write lives in the cache, so
+# the replica is only used when every worker shares it: otherwise a reload
+# served by another worker could read the replica right after a write.
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    __slots__ = ('read_alias', 'wrote')
+
+    def __init__(self):
+        self.read_alias = None
+        self.wrote = False
+
+
+def _sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def configured_replica_alias():
+    alias = settings.REPLICA_DATABASE
+    return alias if alias and alias != DEFAULT_DB_ALIAS else None
+
+
+def replica_alias():
+    """
+    The alias reads are routed to, or ``None`` when there is no replica or
+    the cache (holding the sticky markers) is per process.
+    """
+    return configured_replica_alias() if cache_is_shared() else None
+
+
+def begin_request():
+    return _state.set(RoutingState())
+
+
+def end_request(token, user=None):
+    state = _state.get()
+    _state.reset(token)
+    if state is not None and state.wrote and user is not None and user.is_authenticated and replica_alias():
+        cache.set(_sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def route_reads(request):
+    """
+    Sends the rest of the current request's reads to the replica when it is a
+    safe-method request of a user without a recent write.
+    """
+    state = _state.get()
+    alias = replica_alias()
+    if state is None or alias is None or state.wrote or request.method not in SAFE_METHODS:
+        return
+    user = request.user
+    if user is not None and user.is_authenticated and cache.get(_sticky_key(user.pk)):
+        return
+    state.read_alias = alias
+
+
+def current_read_alias():
+    state = _state.get()
+    return state.read_alias if state is not None else None
+
+
+@contextmanager
+def primary_reads():
+    """
+    Reads inside the block use the primary. Loaders that fill version-keyed
+    caches use it: a lagging replica would cache stale rows under a new version.
+    """
+    state = _state.get()
+    if state is None or state.read_alias is None:
+        yield
+        return
+    alias = state.read_alias
+    state.read_alias = None
+    try:
+        yield
+    finally:
+        if not state.wrote:
+            state.read_alias = alias
+
+
+def bind_reads(iterable):
+    """
+    Wraps a streaming response body so it is produced with the read routing
+    of the request that created it; the body is consumed after the view returns.
+    """
+    alias = current_read_alias()
+    if alias is None:
+        return iterable
+    return _bound(iterable, alias)
+
+
+def _bound(iterable, alias):
+    iterator = iter(iterable)
+    while True:
+        state = RoutingState()
+        state.read_alias = alias
+        token = _state.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.read_alias is not None:
+            return state.read_alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and not state.wrote:
+            # Read-your-writes: the rest of the request reads the primary
+            state.wrote = True
+            state.read_alias = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication
+        return db != configured_replica_alias()
+
+
+class ReplicaReadMixin:
+    """
+    Viewset mixin: safe-method actions read from the replica once the user is
+    authenticated; anything else, and anything after a write, uses the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = begin_request()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            end_request(token, getattr(request, 'user', None))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        route_reads(request)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = bind_reads(response.streaming_content)
+        return response
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .db_routing import primary_reads
+from .models import Card, UserProfile
+from .roster import roster
+from .versioning import BOARD, TEAM, cache_timeout, team_version
+
+COLUMNS = [column for column, _ in Card.COLUMN_CHOICES]
+PRIORITIES = [priority for priority, _ in Card.PRIORITY_CHOICES]
+
+
+def _facets_key(team_id, today):
+    # The board version changes with every card write and the team version with
+    # membership and member renames; the date decides what is overdue
+    return f"team:facets:{team_id}:{team_version(team_id, TEAM)}:{team_version(team_id, BOARD)}:{today.isoformat()}"
+
+
+def count_facets(team_id, today):
+    """
+    Card counts of a team by column, priority and assignee, each with its
+    overdue share (deadline passed, not done), from one grouped query that
+    the card_team_facets_idx index covers.
+    """
+    rows = Card.objects.filter(team_id=team_id).values('column', 'priority', 'assigned_to_id').annotate(
+        cards=Count('id'),
+        overdue=Count('id', filter=Q(deadline__lt=today) & ~Q(column='done')),
+    ).order_by()
+
+    columns = {column: {'cards': 0, 'overdue': 0} for column in COLUMNS}
+    priorities = {priority: {'cards': 0, 'overdue': 0} for priority in PRIORITIES}
+    assignees = {}
+    total = overdue = 0
+    for row in rows:
+        for bucket in (
+            columns.setdefault(row['column'], {'cards': 0, 'overdue': 0}),
+            priorities.setdefault(row['priority'], {'cards': 0, 'overdue': 0}),
+            assignees.setdefault(row['assigned_to_id'], {'id': row['assigned_to_id'], 'cards': 0, 'overdue': 0}),
+        ):
+            bucket['cards'] += row['cards']
+            bucket['overdue'] += row['overdue']
+        total += row['cards']
+        overdue += row['overdue']
+
+    names = {profile_id: name for profile_id, name, _ in roster(team_id)}
+    # Cards can stay assigned to someone who has left the team
+    missing = [profile_id for profile_id in assignees if profile_id is not None and profile_id not in names]
+    if missing:
+        names.update(UserProfile.objects.filter(id__in=missing).values_list('id', 'name'))
+    for bucket in assignees.values():
+        bucket['name'] = names.get(bucket['id'])
+    return {
+        'team': int(team_id),
+        'date': today,
+        'total': total,
+        'overdue': overdue,
+        'columns': columns,
+        'priorities': priorities,
+        # Most loaded first; unassigned cards are the entry with a null id
+        'assignees': sorted(assignees.values(), key=lambda bucket: (-bucket['cards'], bucket['id'] or 0)),
+    }
+
+
+def board_facets(team_id):
+    """
+    ``count_facets`` for today, cached under the team's versions (for a few
+    seconds only when the cache is not shared by all workers).
+    """
+    today = timezone.localdate()
+    key = _facets_key(team_id, today)
+    facets = cache.get(key)
+    if facets is None:
+        with primary_reads():
+            facets = count_facets(team_id, today)
+        cache.set(key, facets, cache_timeout(settings.TEAM_FACETS_CACHE_TIMEOUT))
+    return facets
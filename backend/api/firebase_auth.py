@@ -1,75 +1,299 @@
+import asyncio
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
 from firebase_admin import auth, credentials, initialize_app
 from rest_framework import authentication
 from rest_framework import exceptions
 from django.contrib.auth.models import User
-import os
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .metrics import HitCounter
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+_firebase_lock = threading.Lock()
+_firebase_ready = False
+
+
+def _ensure_firebase_app():
+    # Initialize Firebase Admin with the credentials on first use
+    global _firebase_ready
+    if _firebase_ready:
+        return
+    with _firebase_lock:
+        if _firebase_ready:
+            return
+        cred = credentials.Certificate(os.path.join(settings.BASE_DIR, 'api', 'firebase_credential.json'))
+        try:
+            initialize_app(cred)
+        except ValueError:
+            # App already initialized
+            pass
+        _firebase_ready = True
+
+
+def verify_id_token(token):
+    """
+    Verifies a Firebase ID token and returns its decoded claims.
+    ``FIREBASE_TOKEN_VERIFIER`` may name a replacement callable (tests, load replay).
+    """
+    verifier_path = getattr(settings, 'FIREBASE_TOKEN_VERIFIER', None)
+    if verifier_path:
+        return import_string(verifier_path)(token)
+    _ensure_firebase_app()
+    return auth.verify_id_token(token)
+
+
+class BoundedTTLCache:
+    """
+    LRU mapping with a fixed capacity whose entries expire at their own deadline
+    (seconds since the epoch). Safe to share between request threads.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Claims we keep from a verified token; the token itself is never stored.
+TokenClaims = namedtuple('TokenClaims', ['uid', 'email', 'name', 'exp'])
+
+token_cache = BoundedTTLCache(getattr(settings, 'FIREBASE_TOKEN_CACHE_SIZE', 10000))
+user_cache = BoundedTTLCache(getattr(settings, 'FIREBASE_USER_CACHE_SIZE', 10000))
+token_cache_stats = HitCounter('firebase_token_cache')
+user_cache_stats = HitCounter('firebase_user_cache')
+
+
+def _token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _cached_claims(token):
+    claims = token_cache.get(_token_digest(token))
+    if claims is not None:
+        token_cache_stats.hit()
+    return claims
+
+
+def _verify_claims(token):
+    claims = _cached_claims(token)
+    if claims is not None:
+        return claims
+    token_cache_stats.miss()
+    try:
+        decoded_token = verify_id_token(token)
+    except Exception as e:
+        logger.warning(f"Firebase token verification failed: {str(e)}")
+        raise exceptions.AuthenticationFailed(f'Invalid Firebase token: {str(e)}')
+    claims = TokenClaims(
+        uid=decoded_token['uid'],
+        email=decoded_token.get('email') or '',
+        name=decoded_token.get('name') or '',
+        exp=float(decoded_token.get('exp') or 0),
+    )
+    # A token without a usable ``exp`` is simply not cached.
+    token_cache.set(_token_digest(token), claims, claims.exp)
+    return claims
+
+
+def _user_fields_from_claims(claims):
+    return {
+        'email': claims.email,
+        'first_name': claims.name[:User._meta.get_field('first_name').max_length],
+    }
+
+
+def _apply_claims(user, claims):
+    """
+    Copies email/name from the token onto ``user`` and returns the changed fields.
+    """
+    changed = []
+    for field, value in _user_fields_from_claims(claims).items():
+        if value and getattr(user, field) != value:
+            setattr(user, field, value)
+            changed.append(field)
+    return changed
+
+
+def _sync_user(user, claims):
+    # Writes only the columns that changed
+    changed = _apply_claims(user, claims)
+    if changed:
+        user.save(update_fields=changed)
+        logger.debug(f"Synced {changed} for user with uid: {claims.uid}")
+    return user
+
+
+async def _async_sync_user(user, claims):
+    changed = _apply_claims(user, claims)
+    if changed:
+        await user.asave(update_fields=changed)
+        logger.debug(f"Synced {changed} for user with uid: {claims.uid}")
+    return user
+
+
+def _load_user(claims):
+    user, created = User.objects.get_or_create(
+        username=claims.uid,
+        defaults={**_user_fields_from_claims(claims), 'is_active': True}
+    )
+    if created:
+        logger.debug(f"Created new user with uid: {claims.uid}")
+        # The post_save signal already created the profile from first_name
+        if not claims.name and claims.email:
+            from .models import UserProfile
+            UserProfile.objects.filter(user=user).update(name=claims.email.split('@')[0])
+    return user
+
+
+async def _async_load_user(claims):
+    user, created = await User.objects.aget_or_create(
+        username=claims.uid,
+        defaults={**_user_fields_from_claims(claims), 'is_active': True}
+    )
+    if created:
+        logger.debug(f"Created new user with uid: {claims.uid}")
+        if not claims.name and claims.email:
+            from .models import UserProfile
+            await UserProfile.objects.filter(user=user).aupdate(name=claims.email.split('@')[0])
+    return user
+
+
+def _cached_user(claims):
+    user = user_cache.get(claims.uid)
+    if user is None:
+        user_cache_stats.miss()
+    else:
+        user_cache_stats.hit()
+    return user
+
+
+def _remember_user(claims, user):
+    user_cache.set(claims.uid, user, time.time() + getattr(settings, 'FIREBASE_USER_CACHE_TTL', 300))
+    return _detached(user)
+
+
+def _detached(user):
+    # Hand every request its own instance so per-request relation caches
+    # (e.g. ``user.profile``) never leak between requests.
+    clone = copy.copy(user)
+    clone._state.fields_cache = {}
+    return clone
+
+
+def authenticate_token(token):
+    """
+    Resolves a Firebase ID token to a ``User``.
+
+    A token is verified once and its claims cached until its ``exp``; the
+    uid -> User lookup is cached for ``FIREBASE_USER_CACHE_TTL`` seconds and the
+    User row is only written when the email or name in the token changed.
+    """
+    claims = _verify_claims(token)
+    user = _cached_user(claims) or _load_user(claims)
+    return _remember_user(claims, _sync_user(user, claims))
+
+
+_verify_pool = None
+_verify_pool_lock = threading.Lock()
+
+
+def _get_verify_pool():
+    global _verify_pool
+    if _verify_pool is None:
+        with _verify_pool_lock:
+            if _verify_pool is None:
+                _verify_pool = ThreadPoolExecutor(
+                    max_workers=settings.FIREBASE_VERIFY_WORKERS, thread_name_prefix='firebase-verify'
+                )
+    return _verify_pool
+
+
+async def aauthenticate_token(token):
+    """
+    Async ``authenticate_token`` for ASGI views. Cached claims are used in
+    place; verifying a new token (a network round trip to Firebase's keys
+    on a cold cache) runs in a pool of FIREBASE_VERIFY_WORKERS threads, so
+    a slow verification holds neither the event loop nor a request thread.
+    """
+    claims = _cached_claims(token)
+    if claims is None:
+        claims = await asyncio.get_running_loop().run_in_executor(_get_verify_pool(), _verify_claims, token)
+    user = _cached_user(claims) or await _async_load_user(claims)
+    return _remember_user(claims, await _async_sync_user(user, claims))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.pop(instance.username)
 
-# Initialize Firebase Admin with the credentials
-cred = credentials.Certificate(os.path.join(settings.BASE_DIR, 'api', 'firebase_credential.json'))
-try:
-    initialize_app(cred)
-except ValueError:
-    # App already initialized
-    pass
 
 class FirebaseAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION')
         if not auth_header:
-            print("No Authorization header found")
+            logger.debug("No Authorization header found")
             return None
 
-        try:
-            # Check if the header starts with 'Bearer'
-            if not auth_header.startswith('Bearer '):
-                raise exceptions.AuthenticationFailed('Invalid token format. Use Bearer token.')
-            
-            token = auth_header.split(' ')[1]
-            if not token:
-                raise exceptions.AuthenticationFailed('No token provided')
-
-            try:
-                # Verify the Firebase token
-                decoded_token = auth.verify_id_token(token)
-                print("Token decoded successfully:", decoded_token)
-            except Exception as e:
-                print(f"Firebase token verification failed: {str(e)}")
-                raise exceptions.AuthenticationFailed(f'Invalid Firebase token: {str(e)}')
-
-            uid = decoded_token['uid']
-            email = decoded_token.get('email', '')
-            name = decoded_token.get('name', '')
-            
-            # Get or create user
-            user, created = User.objects.get_or_create(
-                username=uid,
-                defaults={
-                    'email': email,
-                    'is_active': True,
-                    'first_name': name.split()[0] if name else '',
-                    'last_name': ' '.join(name.split()[1:]) if name and len(name.split()) > 1 else ''
-                }
-            )
-            
-            if created:
-                print(f"Created new user with uid: {uid}")
-                # Create profile for new user
-                from .models import UserProfile
-                UserProfile.objects.create(
-                    user=user,
-                    name=name or email.split('@')[0],
-                    role='Team Member',
-                    is_active=True
-                )
-            else:
-                print(f"Found existing user with uid: {uid}")
+        # Check if the header starts with 'Bearer'
+        if not auth_header.startswith('Bearer '):
+            raise exceptions.AuthenticationFailed('Invalid token format. Use Bearer token.')
+
+        token = auth_header.split(' ')[1]
+        if not token:
+            raise exceptions.AuthenticationFailed('No token provided')
 
-            return (user, None)
-            
+        try:
+            with profiling.phase('auth'):
+                return (authenticate_token(token), None)
         except exceptions.AuthenticationFailed as e:
-            print(f"Authentication failed: {str(e)}")
+            logger.warning(f"Authentication failed: {str(e)}")
             raise
         except Exception as e:
-            print(f"Unexpected error during authentication: {str(e)}")
+            logger.error(f"Unexpected error during authentication: {str(e)}")
             raise exceptions.AuthenticationFailed(f'Authentication error: {str(e)}')
@@ -0,0 +1,232 @@
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from .models import Card, TeamMember
+
+logger = logging.getLogger(__name__)
+
+# Replays the request mix of the Dashboard and Sprint Board pages against the
+# app in-process (django.test.Client, full middleware stack). Requests carry
+# the actor's Firebase uid as the bearer token, which ``stub_verify_id_token``
+# accepts when it is installed as FIREBASE_TOKEN_VERIFIER.
+
+Actor = namedtuple('Actor', 'uid team_id is_manager card_ids assigned_ids')
+
+PERCENTILES = (50, 95, 99)
+
+
+def stub_verify_id_token(token):
+    return {'uid': token, 'email': f'{token}@example.com', 'name': token, 'exp': time.time() + 3600}
+
+
+def load_actors(prefix, limit=None, cards_per_team=200):
+    """
+    Team members whose Firebase uid starts with ``prefix``, each with a sample
+    of their team's cards (and of the cards assigned to them) to act on.
+    """
+    members = TeamMember.objects.filter(user_profile__user__username__startswith=prefix).order_by('id').values_list(
+        'user_profile__user__username', 'user_profile_id', 'team_id', 'user_profile__role'
+    )
+    if limit:
+        members = members[:limit]
+    members = list(members)
+    cards = defaultdict(list)
+    for team_id in {team_id for _, _, team_id, _ in members}:
+        cards[team_id] = list(
+            Card.objects.filter(team_id=team_id).order_by('id').values_list('id', 'assigned_to_id')[:cards_per_team]
+        )
+    return [
+        Actor(
+            uid=uid,
+            team_id=team_id,
+            is_manager=role == 'Project Manager',
+            card_ids=[card_id for card_id, _ in cards[team_id]],
+            assigned_ids=[card_id for card_id, assignee in cards[team_id] if assignee == profile_id],
+        )
+        for uid, profile_id, team_id, role in members
+    ]
+
+
+# Scenarios return the steps of one user action: a list of
+# (endpoint label, method, path, JSON body or None)
+def dashboard_load(actor, rng):
+    return [
+        ('GET /api/profile/', 'get', '/api/profile/', None),
+        ('GET /api/teams/', 'get', '/api/teams/', None),
+        ('GET /api/cards/?team_id', 'get', f'/api/cards/?team_id={actor.team_id}', None),
+    ]
+
+
+def sprint_board_load(actor, rng):
+    return [
+        ('GET /api/profile/', 'get', '/api/profile/', None),
+        ('GET /api/cards/?team_id', 'get', f'/api/cards/?team_id={actor.team_id}', None),
+        ('GET /api/teams/{id}/', 'get', f'/api/teams/{actor.team_id}/', None),
+    ]
+
+
+def move_card(actor, rng):
+    if not actor.card_ids:
+        return []
+    column = rng.choice(Card.COLUMN_CHOICES)[0]
+    return [('PATCH /api/cards/{id}/', 'patch', f'/api/cards/{rng.choice(actor.card_ids)}/', {'column': column})]
+
+
+def update_progress(actor, rng):
+    card_ids = actor.card_ids if actor.is_manager else actor.assigned_ids
+    if not card_ids:
+        return []
+    progress = rng.choice((0, 25, 50, 75, 100))
+    return [('PATCH /api/cards/{id}/', 'patch', f'/api/cards/{rng.choice(card_ids)}/', {'progress': progress})]
+
+
+def edit_sprint(actor, rng):
+    if not actor.is_manager or not actor.card_ids:
+        return []
+    start = timezone.now() + timedelta(days=rng.randrange(-7, 7))
+    body = {
+        'sprint_start': start.isoformat(),
+        'sprint_finish': (start + timedelta(days=14)).isoformat(),
+        'column': rng.choice(Card.COLUMN_CHOICES)[0],
+    }
+    return [('PATCH /api/cards/{id}/', 'patch', f'/api/cards/{rng.choice(actor.card_ids)}/', body)]
+
+
+def add_card(actor, rng):
+    if not actor.is_manager:
+        return []
+    body = {
+        'team': actor.team_id,
+        'column': 'backlog',
+        'title': f'Load test task {rng.randrange(10 ** 6)}',
+        'priority': rng.choice(Card.PRIORITY_CHOICES)[0],
+        'deadline': (timezone.localdate() + timedelta(days=rng.randrange(1, 30))).isoformat(),
+        'progress': 0,
+    }
+    return [('POST /api/cards/', 'post', '/api/cards/', body)]
+
+
+# (weight, scenario, writes). Page loads dominate; the writes are the card
+# moves and edits both pages make. Scenarios an actor may not perform (e.g.
+# adding a card as a Team Member) yield no steps and are redrawn.
+SCENARIOS = [
+    (40, dashboard_load, False),
+    (20, sprint_board_load, False),
+    (15, move_card, True),
+    (10, update_progress, True),
+    (5, edit_sprint, True),
+    (5, add_card, True),
+]
+
+
+def percentile(ordered, p):
+    # Nearest-rank percentile of an already sorted list
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class LoadReplay:
+    """
+    Runs ``requests`` steps (or as many as fit in ``duration`` seconds) of the
+    scenario mix, spread over ``concurrency`` threads, each with its own
+    client and database connection. The first ``warmup`` steps of each thread
+    are not recorded.
+    """
+
+    def __init__(self, actors, read_only=False, seed=None):
+        if not actors:
+            raise ValueError("No actors to replay requests as")
+        self.actors = actors
+        self.scenarios = [(weight, scenario) for weight, scenario, writes in SCENARIOS if not (read_only and writes)]
+        self.seed = seed
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def run(self, requests=1000, duration=None, concurrency=1, warmup=0):
+        per_thread = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        deadline = time.perf_counter() + duration if duration else None
+        started = time.perf_counter()
+        if concurrency == 1:
+            # Inline, so the replay sees the caller's transaction (tests)
+            self._worker(0, per_thread[0], deadline, warmup, close_connection=False)
+        else:
+            threads = [
+                threading.Thread(target=self._worker, args=(i, count, deadline, warmup), daemon=True)
+                for i, count in enumerate(per_thread)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return self.report(time.perf_counter() - started)
+
+    def _worker(self, index, count, deadline, warmup, close_connection=True):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        weights = [weight for weight, _ in self.scenarios]
+        scenarios = [scenario for _, scenario in self.scenarios]
+        client = Client()
+        done = 0
+        try:
+            while (deadline is None and done < count + warmup) or (deadline is not None and time.perf_counter() < deadline):
+                actor = rng.choice(self.actors)
+                steps = rng.choices(scenarios, weights)[0](actor, rng)
+                for label, method, path, body in steps:
+                    elapsed, status = self._send(client, actor, method, path, body)
+                    done += 1
+                    if done > warmup:
+                        self._record(label, elapsed, status)
+        finally:
+            if close_connection:
+                connection.close()
+
+    @staticmethod
+    def _send(client, actor, method, path, body):
+        kwargs = {'HTTP_AUTHORIZATION': f'Bearer {actor.uid}'}
+        if body is not None:
+            kwargs.update(data=json.dumps(body), content_type='application/json')
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return time.perf_counter() - started, response.status_code
+
+    def _record(self, label, elapsed, status):
+        with self._lock:
+            self.samples[label].append(elapsed)
+            if status >= 400:
+                self.errors[label] += 1
+                logger.warning(f"Load replay: {label} answered {status}")
+
+    def report(self, wall_time):
+        """
+        Per endpoint label: request count, errors, throughput (requests per
+        second of wall time) and latency percentiles in milliseconds.
+        """
+        rows = {}
+        for label, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            rows[label] = {
+                'requests': len(ordered),
+                'errors': self.errors[label],
+                'rps': len(ordered) / wall_time if wall_time else 0.0,
+                **{f'p{p}': percentile(ordered, p) * 1000 for p in PERCENTILES},
+            }
+        overall = sorted(elapsed for samples in self.samples.values() for elapsed in samples)
+        return {
+            'wall_time': wall_time,
+            'requests': len(overall),
+            'errors': sum(self.errors.values()),
+            'rps': len(overall) / wall_time if wall_time else 0.0,
+            **{f'p{p}': percentile(overall, p) * 1000 if overall else 0.0 for p in PERCENTILES},
+            'endpoints': rows,
+        }
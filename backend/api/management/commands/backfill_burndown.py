@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from api.burndown import snapshot_team
+from api.models import Team
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a burndown snapshot of each team's current board. Cards only store "
+        "their current column, so days before the first snapshot cannot be rebuilt; "
+        "run this once after deploying and the Card signals keep the snapshots current."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, action='append', dest='teams', help='Team id (repeatable); all teams by default')
+        parser.add_argument('--date', help='Snapshot date as YYYY-MM-DD; today by default')
+
+    def handle(self, *args, **options):
+        date = parse_date(options['date']) if options['date'] else None
+        teams = Team.objects.all()
+        if options['teams']:
+            teams = teams.filter(id__in=options['teams'])
+        count = 0
+        for team_id in teams.values_list('id', flat=True).iterator():
+            snapshot_team(team_id, date)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted burndown for {count} team(s)"))
@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Card, Team
+from api.projections import card_rows, card_values
+from api.serializers import CardSerializer
+
+
+def serializer_body(cards):
+    return JSONRenderer().render(CardSerializer(cards.select_related('assigned_to', 'updated_by'), many=True).data)
+
+
+def projection_body(cards):
+    return JSONRenderer().render(card_rows(card_values(cards)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Times a card list rendered through CardSerializer and through the .values() "
+        "projection (api/projections.py), query and JSON rendering included, and checks "
+        "both produce the same bytes. Reads cards of the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, help='Team whose cards to render; the largest board by default')
+        parser.add_argument('--cards', type=int, nargs='+', default=[1000, 10000], help='List sizes to time')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path and size')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+        teams = Team.objects.annotate(card_count=Count('cards'))
+        team = teams.filter(id=options['team']).first() if options['team'] else teams.order_by('-card_count').first()
+        if team is None:
+            raise CommandError("No such team; run generate_synthetic_data")
+
+        self.stdout.write(f"{'cards':>8}{'path':>12}{'median ms':>12}{'best ms':>10}{'speedup':>10}")
+        for size in options['cards']:
+            if size > team.card_count:
+                raise CommandError(
+                    f"Team {team.id} has {team.card_count} cards, fewer than {size}; "
+                    f"pick another --team or run generate_synthetic_data --cards {size}"
+                )
+            cards = Card.objects.filter(team=team).order_by('id')[:size]
+            if serializer_body(cards) != projection_body(cards):
+                raise CommandError(f"The projection of {size} cards differs from CardSerializer")
+            medians = {}
+            for label, render in (('serializer', serializer_body), ('projection', projection_body)):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    render(cards)
+                    timings.append((time.perf_counter() - started) * 1000)
+                medians[label] = statistics.median(timings)
+                speedup = f"{medians['serializer'] / medians[label]:.1f}x"
+                self.stdout.write(f"{size:>8}{label:>12}{medians[label]:>12.1f}{min(timings):>10.1f}{speedup:>10}")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.boards import export_board
+from api.models import Team
+
+
+class Command(BaseCommand):
+    help = "Writes a team's board (team, members, cards and optionally work days) as NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('team', type=int, help='Team id')
+        parser.add_argument('--workdays', action='store_true', help="Include the members' work days")
+        parser.add_argument('--output', '-o', help='File to write; standard output by default')
+
+    def handle(self, *args, **options):
+        try:
+            team = Team.objects.get(id=options['team'])
+        except Team.DoesNotExist:
+            raise CommandError(f"Team {options['team']} does not exist")
+        lines = export_board(team, options['workdays'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f"Exported team {team.id} to {options['output']}"))
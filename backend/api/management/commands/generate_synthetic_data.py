@@ -0,0 +1,40 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic import SyntheticBoards
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates synthetic teams, members, cards and work-day history for capacity "
+        "planning. The users' Firebase uids start with the printed prefix; pass it "
+        "to replay_load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=10, help='Number of teams')
+        parser.add_argument('--members', type=int, default=8, help='Members per team, the first being its Project Manager')
+        parser.add_argument('--cards', type=int, default=200, help='Cards per team')
+        parser.add_argument('--days', type=int, default=60, help='Days of work-day history per member')
+        parser.add_argument('--prefix', default='load', help='Username prefix of the synthetic users')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible boards')
+        parser.add_argument('--rollups', action='store_true', help='Run rebuild_work_rollups afterwards')
+
+    def handle(self, *args, **options):
+        if options['teams'] < 1 or options['members'] < 1:
+            raise CommandError("--teams and --members must be at least 1")
+
+        def progress(kind, count):
+            self.stderr.write(f"{count}/{options['teams']} {kind} generated")
+
+        generator = SyntheticBoards(
+            prefix=options['prefix'], batch_size=options['batch_size'], seed=options['seed'], progress=progress
+        )
+        result = generator.run(options['teams'], options['members'], options['cards'], options['days'])
+        if options['rollups']:
+            call_command('rebuild_work_rollups', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {result['teams']} teams, {result['members']} members, {result['cards']} cards and "
+            f"{result['workdays']} work days; user prefix {result['prefix']}"
+        ))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.boards import BoardImportError, BoardImporter
+
+
+class Command(BaseCommand):
+    help = "Creates a team from an NDJSON board export, reporting progress after every batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Export file, or '-' for standard input")
+        parser.add_argument('--code', help='Team code to use instead of the exported one')
+        parser.add_argument('--batch-size', type=int, help='Rows per bulk insert and transaction')
+
+    def handle(self, *args, **options):
+        def progress(kind, count):
+            self.stderr.write(f"{count} {kind} imported")
+
+        importer = BoardImporter(code=options['code'], batch_size=options['batch_size'], progress=progress)
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            result = importer.run(source)
+        except BoardImportError as e:
+            raise CommandError(f"{e} (imported so far: {importer.counts})")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported team {result['team']} ({result['code']}): {result['members']} members, "
+            f"{result['cards']} cards, {result['workdays']} work days"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import TeamWorkRollup, WorkDay, WorkRollup
+from api.worktime import apply_to_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the per-user and per-team work rollups from the ended work days. "
+        "Run it once after deploying; ending a work day keeps the rollups current. "
+        "Team rollups use each user's current teams."
+    )
+
+    def handle(self, *args, **options):
+        count = 0
+        with transaction.atomic():
+            WorkRollup.objects.all().delete()
+            TeamWorkRollup.objects.all().delete()
+            workdays = WorkDay.objects.filter(end_time__isnull=False).values_list(
+                'user_profile_id', 'start_time', 'end_time'
+            )
+            for profile_id, start_time, end_time in workdays.iterator():
+                apply_to_rollups(profile_id, start_time, end_time)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt work rollups from {count} work day(s)"))
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.loadreplay import PERCENTILES, LoadReplay, load_actors
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays the Dashboard and Sprint Board request mix in-process as synthetic "
+        "users (see generate_synthetic_data) and reports latency percentiles and "
+        "throughput per endpoint. Firebase is replaced by a verifier that accepts "
+        "any uid, for this process only. Writes go to the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='load', help='Firebase uid prefix of the users to act as')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests to send (excluding warm-up)')
+        parser.add_argument('--duration', type=float, help='Run for this many seconds instead of --requests')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads')
+        parser.add_argument('--warmup', type=int, default=50, help='Unrecorded requests per thread')
+        parser.add_argument('--users', type=int, help='Act as at most this many users')
+        parser.add_argument('--read-only', action='store_true', help='Only replay page loads')
+        parser.add_argument('--seed', type=int, help='Random seed for the request sequence')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        actors = load_actors(options['prefix'], options['users'])
+        if not actors:
+            raise CommandError(f"No team members with a uid starting with {options['prefix']!r}; run generate_synthetic_data")
+
+        with override_settings(
+            FIREBASE_TOKEN_VERIFIER='api.loadreplay.stub_verify_id_token',
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        ):
+            result = LoadReplay(actors, read_only=options['read_only'], seed=options['seed']).run(
+                requests=options['requests'], duration=options['duration'],
+                concurrency=options['concurrency'], warmup=options['warmup'],
+            )
+
+        columns = ''.join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+        self.stdout.write(f"{'endpoint':<28}{'requests':>10}{'errors':>8}{'req/s':>10}{columns}")
+        rows = [*result['endpoints'].items(), ('all', result)]
+        for label, row in rows:
+            latencies = ''.join(f"{row[f'p{p}']:>10.1f}" for p in PERCENTILES)
+            self.stdout.write(f"{label:<28}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10.1f}{latencies}")
+        self.stdout.write(
+            f"{result['requests']} requests from {len(actors)} users in {result['wall_time']:.1f}s "
+            f"over {options['concurrency']} thread(s)"
+        )
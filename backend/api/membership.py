@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .db_routing import primary_reads
+from .models import TeamMember, UserProfile
+from .versioning import cache_timeout
+
+# Team membership answers most authorization checks, so it is kept in Django's
+# cache framework. TeamMember/UserProfile signals (api/signals.py) keep it fresh
+# in the cache of the worker that made the change. Team sets grant access, so
+# unless the cache is shared they are kept PROCESS_CACHE_TIMEOUT seconds rather
+# than MEMBERSHIP_CACHE_TIMEOUT: a member removed through one worker loses
+# access in the others within seconds. Misses are loaded from the primary
+# database so a lagging read replica cannot cache stale memberships.
+
+
+def _profile_key(user_id):
+    return f"membership:profile-of:{user_id}"
+
+
+def _teams_key(profile_id):
+    return f"membership:teams-of:{profile_id}"
+
+
+def profile_id_for_user(user):
+    """
+    The UserProfile id of ``user``, or ``None`` if the user has no profile yet.
+    """
+    key = _profile_key(user.pk)
+    profile_id = cache.get(key)
+    if profile_id is None:
+        with primary_reads():
+            profile_id = UserProfile.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+        if profile_id is not None:
+            cache.set(key, profile_id, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return profile_id
+
+
+def team_ids_for_profiles(profile_ids):
+    """
+    Maps each profile id to the frozenset of team ids it belongs to.
+    Cache misses are filled with a single TeamMember query.
+    """
+    profile_ids = set(profile_ids)
+    keys = {_teams_key(profile_id): profile_id for profile_id in profile_ids}
+    found = {keys[key]: team_ids for key, team_ids in cache.get_many(keys).items()}
+    missing = profile_ids - found.keys()
+    if missing:
+        loaded = {profile_id: set() for profile_id in missing}
+        with primary_reads():
+            for profile_id, team_id in TeamMember.objects.filter(user_profile_id__in=missing).values_list(
+                'user_profile_id', 'team_id'
+            ):
+                loaded[profile_id].add(team_id)
+        loaded = {profile_id: frozenset(team_ids) for profile_id, team_ids in loaded.items()}
+        cache.set_many(
+            {_teams_key(profile_id): team_ids for profile_id, team_ids in loaded.items()},
+            cache_timeout(settings.MEMBERSHIP_CACHE_TIMEOUT)
+        )
+        found.update(loaded)
+    return found
+
+
+def team_ids_for_profile(profile_id):
+    if profile_id is None:
+        return frozenset()
+    return team_ids_for_profiles([profile_id])[profile_id]
+
+
+def team_ids_for_user(user):
+    return team_ids_for_profile(profile_id_for_user(user))
+
+
+async def aprofile_id_for_user(user):
+    key = _profile_key(user.pk)
+    profile_id = cache.get(key)
+    if profile_id is None:
+        with primary_reads():
+            profile_id = await UserProfile.objects.filter(user_id=user.pk).values_list('id', flat=True).afirst()
+        if profile_id is not None:
+            cache.set(key, profile_id, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return profile_id
+
+
+async def ateam_ids_for_user(user):
+    """
+    Async ``team_ids_for_user``: the same cache entries, misses loaded with
+    the async ORM.
+    """
+    profile_id = await aprofile_id_for_user(user)
+    if profile_id is None:
+        return frozenset()
+    key = _teams_key(profile_id)
+    team_ids = cache.get(key)
+    if team_ids is None:
+        with primary_reads():
+            team_ids = frozenset([
+                team_id async for team_id in
+                TeamMember.objects.filter(user_profile_id=profile_id).values_list('team_id', flat=True)
+            ])
+        cache.set(key, team_ids, cache_timeout(settings.MEMBERSHIP_CACHE_TIMEOUT))
+    return team_ids
+
+
+def _as_id(team_id):
+    try:
+        return int(team_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_member(user, team_id):
+    return _as_id(team_id) in team_ids_for_user(user)
+
+
+async def ais_member(user, team_id):
+    return _as_id(team_id) in await ateam_ids_for_user(user)
+
+
+def is_profile_member(profile_id, team_id):
+    return _as_id(team_id) in team_ids_for_profile(profile_id)
+
+
+def invalidate_profile(profile_id):
+    cache.delete(_teams_key(profile_id))
+
+
+def invalidate_profiles(profile_ids):
+    cache.delete_many([_teams_key(profile_id) for profile_id in profile_ids])
+
+
+def forget_user(user_id):
+    cache.delete(_profile_key(user_id))
@@ -0,0 +1,45 @@
+import threading
+
+# Every counter created through ``HitCounter`` registers itself here so the
+# numbers can be reported from one place.
+COUNTERS = {}
+
+
+class HitCounter:
+    """
+    Thread-safe hit/miss tally for an in-process cache or shortcut path.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        COUNTERS[name] = self
+
+    def hit(self):
+        with self._lock:
+            self._hits += 1
+
+    def miss(self):
+        with self._lock:
+            self._misses += 1
+
+    def reset(self):
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+    def snapshot(self):
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    @property
+    def hit_rate(self):
+        return self.snapshot()['hit_rate']
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['team', 'updated_at', 'id'], name='card_team_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_card_team_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_tombstones', to='api.team')),
+            ],
+            options={
+                'verbose_name': 'Card Tombstone',
+                'verbose_name_plural': 'Card Tombstones',
+                'indexes': [models.Index(fields=['team', 'deleted_at'], name='tombstone_team_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_card_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BurndownSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('column', models.CharField(choices=[('backlog', 'Backlog'), ('todo', 'TODO'), ('doing', 'In Progress'), ('review', 'Review'), ('done', 'Complete')], max_length=20)),
+                ('card_count', models.IntegerField(default=0)),
+                ('progress_total', models.IntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='burndown_snapshots', to='api.team')),
+            ],
+            options={
+                'verbose_name': 'Burndown Snapshot',
+                'verbose_name_plural': 'Burndown Snapshots',
+                'constraints': [models.UniqueConstraint(fields=('team', 'date', 'column'), name='unique_burndown_snapshot')],
+            },
+        ),
+    ]
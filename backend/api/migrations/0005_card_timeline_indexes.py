@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_burndown_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['team', 'start_date'], name='card_team_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['team', 'deadline'], name='card_team_deadline_idx'),
+        ),
+    ]
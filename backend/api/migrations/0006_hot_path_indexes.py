@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+def close_duplicate_open_workdays(apps, schema_editor):
+    """
+    Before the one-open-workday constraint can be added, every user may have
+    only one open work day: older extra ones are closed at the start of the
+    newest one (their duration is left empty).
+    """
+    WorkDay = apps.get_model('api', 'WorkDay')
+    latest = {}
+    for workday in WorkDay.objects.filter(end_time__isnull=True).order_by('user_profile_id', '-start_time'):
+        if workday.user_profile_id not in latest:
+            latest[workday.user_profile_id] = workday
+            continue
+        workday.end_time = latest[workday.user_profile_id].start_time
+        workday.save(update_fields=['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_card_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_workdays, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['team', 'column'], name='card_team_column_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['user_profile', 'team'], name='teammember_profile_team_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='workday',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('user_profile',), name='one_open_workday_per_user'),
+        ),
+    ]
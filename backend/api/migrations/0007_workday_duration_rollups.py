@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_durations(apps, schema_editor):
+    """
+    Fills duration_seconds for ended work days from their start and end times.
+    working_hours is left as stored; it dropped whole days. Days that 0006
+    closed at the start of a newer one keep an empty duration.
+    """
+    WorkDay = apps.get_model('api', 'WorkDay')
+    force_closed = WorkDay.objects.filter(user_profile_id=OuterRef('user_profile_id'), start_time=OuterRef('end_time'))
+    ended = WorkDay.objects.filter(end_time__isnull=False).exclude(Exists(force_closed))
+    batch = []
+    for workday in ended.only('start_time', 'end_time').iterator():
+        workday.duration_seconds = max(0, int(workday.end_time.timestamp()) - int(workday.start_time.timestamp()))
+        batch.append(workday)
+        if len(batch) == 1000:
+            WorkDay.objects.bulk_update(batch, ['duration_seconds'])
+            batch = []
+    WorkDay.objects.bulk_update(batch, ['duration_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workday',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='workday',
+            name='working_hours',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_durations, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='TeamWorkRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('seconds', models.BigIntegerField(default=0)),
+                ('workdays', models.IntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_rollups', to='api.team')),
+            ],
+            options={
+                'verbose_name': 'Team Work Rollup',
+                'verbose_name_plural': 'Team Work Rollups',
+                'constraints': [models.UniqueConstraint(fields=('team', 'period', 'period_start'), name='unique_team_work_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('seconds', models.BigIntegerField(default=0)),
+                ('workdays', models.IntegerField(default=0)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_rollups', to='api.userprofile')),
+            ],
+            options={
+                'verbose_name': 'Work Rollup',
+                'verbose_name_plural': 'Work Rollups',
+                'constraints': [models.UniqueConstraint(fields=('user_profile', 'period', 'period_start'), name='unique_work_rollup')],
+            },
+        ),
+    ]
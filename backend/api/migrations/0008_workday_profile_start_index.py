@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_workday_duration_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workday',
+            index=models.Index(fields=['user_profile', 'start_time'], name='workday_profile_start_idx'),
+        ),
+    ]
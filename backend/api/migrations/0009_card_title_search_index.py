@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from api.search import install_index
+    install_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from api.search import drop_index
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index on card titles: an FTS5 table on SQLite, a FULLTEXT index
+    on MySQL. Other databases search through api.search's in-process index.
+    """
+
+    dependencies = [
+        ('api', '0008_workday_profile_start_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_card_title_search_index'),
+    ]
+
+    # card_team_column_idx is dropped rather than kept beside the new index:
+    # (team, column) is a prefix of card_team_facets_idx, which serves those
+    # filters (board columns) as well as the facet counts
+    operations = [
+        migrations.RemoveIndex(
+            model_name='card',
+            name='card_team_column_idx',
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['team', 'column', 'priority', 'assigned_to', 'deadline'], name='card_team_facets_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-17 21:45
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+# The conditional constraint of 0006 was never enforced by MySQL, so users may
+# have several open work days there; they are closed as in 0006.
+close_duplicate_open_workdays = import_module('api.migrations.0006_hot_path_indexes').close_duplicate_open_workdays
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_card_facets_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_workdays, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='workday',
+            name='one_open_workday_per_user',
+        ),
+        migrations.AddConstraint(
+            model_name='workday',
+            constraint=models.UniqueConstraint(models.Case(models.When(end_time__isnull=True, then=models.F('user_profile'))), name='one_open_workday_per_user'),
+        ),
+    ]
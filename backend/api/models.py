@@ -81,6 +81,10 @@ class TeamMember(models.Model):
         unique_together = ('team', 'user_profile')
         verbose_name = 'Team Member'
         verbose_name_plural = 'Team Members'
+        indexes = [
+            # "Which teams is this user in" is answered from the index alone
+            models.Index(fields=['user_profile', 'team'], name='teammember_profile_team_idx'),
+        ]
 
     def __str__(self):
         return f"{self.member_name} - {self.team.name}"
@@ -120,12 +124,62 @@ class Card(models.Model):
     class Meta:
         verbose_name = 'Card'
         verbose_name_plural = 'Cards'
+        indexes = [
+            # Keyset pagination of a team's board on (updated_at, id)
+            models.Index(fields=['team', 'updated_at', 'id'], name='card_team_updated_idx'),
+            # Date-window lookups for the timeline (Gantt / Roadmap)
+            models.Index(fields=['team', 'start_date'], name='card_team_start_idx'),
+            models.Index(fields=['team', 'deadline'], name='card_team_deadline_idx'),
+            # Board columns (filters) and the facet counts, which it covers
+            models.Index(
+                fields=['team', 'column', 'priority', 'assigned_to', 'deadline'], name='card_team_facets_idx'
+            ),
+        ]
+
+class CardTombstone(models.Model):
+    """
+    Marks a deleted card so clients doing delta sync can remove it locally.
+    """
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='card_tombstones')
+    card_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Card {self.card_id} deleted from team {self.team_id}"
+
+    class Meta:
+        verbose_name = 'Card Tombstone'
+        verbose_name_plural = 'Card Tombstones'
+        indexes = [
+            models.Index(fields=['team', 'deleted_at'], name='tombstone_team_deleted_idx'),
+        ]
+
+class BurndownSnapshot(models.Model):
+    """
+    Per-column card count and summed progress of a team's board on one day.
+    """
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='burndown_snapshots')
+    date = models.DateField()
+    column = models.CharField(max_length=20, choices=Card.COLUMN_CHOICES)
+    card_count = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.team_id} {self.date} {self.column}: {self.card_count}"
+
+    class Meta:
+        verbose_name = 'Burndown Snapshot'
+        verbose_name_plural = 'Burndown Snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'date', 'column'], name='unique_burndown_snapshot'),
+        ]
 
 class WorkDay(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='workdays')
     start_time = models.DateTimeField()
     end_time = models.DateTimeField(null=True, blank=True)
-    working_hours = models.CharField(max_length=8, null=True, blank=True)  # Format: HH:MM:SS
+    working_hours = models.CharField(max_length=12, null=True, blank=True)  # Format: HH:MM:SS
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True)  # Set when the day ends
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -134,6 +188,66 @@ class WorkDay(models.Model):
     class Meta:
         verbose_name = 'Work Day'
         verbose_name_plural = 'Work Days'
+        indexes = [
+            # Per-user history and timesheet exports over a date range
+            models.Index(fields=['user_profile', 'start_time'], name='workday_profile_start_idx'),
+        ]
+        constraints = [
+            # At most one open work day per user. A unique index on an
+            # expression that is NULL for ended days, not a partial index:
+            # MySQL ignores conditions on unique constraints, while it (8.0.13+)
+            # and SQLite both enforce functional ones
+            models.UniqueConstraint(
+                models.Case(models.When(end_time__isnull=True, then=models.F('user_profile'))),
+                name='one_open_workday_per_user'
+            ),
+        ]
+
+class WorkRollup(models.Model):
+    """
+    Worked seconds and started work days of a user per day or week.
+    Weeks start on Monday; days are local (TIME_ZONE) dates.
+    """
+    PERIOD_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+    )
+
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='work_rollups')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    seconds = models.BigIntegerField(default=0)
+    workdays = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_profile_id} {self.period} {self.period_start}: {self.seconds}s"
+
+    class Meta:
+        verbose_name = 'Work Rollup'
+        verbose_name_plural = 'Work Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['user_profile', 'period', 'period_start'], name='unique_work_rollup'),
+        ]
+
+class TeamWorkRollup(models.Model):
+    """
+    Worked seconds and started work days of a team's members per day or week.
+    """
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='work_rollups')
+    period = models.CharField(max_length=4, choices=WorkRollup.PERIOD_CHOICES)
+    period_start = models.DateField()
+    seconds = models.BigIntegerField(default=0)
+    workdays = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.team_id} {self.period} {self.period_start}: {self.seconds}s"
+
+    class Meta:
+        verbose_name = 'Team Work Rollup'
+        verbose_name_plural = 'Team Work Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'period', 'period_start'], name='unique_team_work_rollup'),
+        ]
 
 # Signal to create/update UserProfile when User is created
 @receiver(post_save, sender=User)
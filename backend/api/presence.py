@@ -0,0 +1,100 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceStore:
+    """
+    In-process record of when each UserProfile was last seen.
+
+    Requests only touch memory; a background flusher writes the pending
+    timestamps to ``UserProfile.last_login`` with a single ``bulk_update``
+    every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, flush_interval=30, retention=3600):
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._last_seen = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def touch(self, profile_id, when=None):
+        when = when or timezone.now()
+        with self._lock:
+            self._last_seen[profile_id] = when
+            self._dirty.add(profile_id)
+        self._ensure_flusher()
+        return when
+
+    def last_seen(self, profile_id):
+        with self._lock:
+            return self._last_seen.get(profile_id)
+
+    def flush(self):
+        from .models import UserProfile
+
+        with self._lock:
+            pending = {profile_id: self._last_seen[profile_id] for profile_id in self._dirty}
+            self._dirty.clear()
+        if not pending:
+            return 0
+        try:
+            UserProfile.objects.bulk_update(
+                [UserProfile(id=profile_id, last_login=seen) for profile_id, seen in pending.items()],
+                ['last_login'],
+                batch_size=500
+            )
+        except Exception as e:
+            logger.error(f"Error flushing presence for {len(pending)} profiles: {str(e)}")
+            with self._lock:
+                # Keep the newer timestamp if the profile was touched meanwhile
+                self._dirty.update(pending)
+            return 0
+        self._evict_stale()
+        logger.debug(f"Flushed presence for {len(pending)} profiles")
+        return len(pending)
+
+    def _evict_stale(self):
+        # Flushed entries are already persisted, so old ones can be forgotten
+        cutoff = timezone.now() - timedelta(seconds=self.retention)
+        with self._lock:
+            stale = [
+                profile_id for profile_id, seen in self._last_seen.items()
+                if seen < cutoff and profile_id not in self._dirty
+            ]
+            for profile_id in stale:
+                del self._last_seen[profile_id]
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name='presence-flusher', daemon=True)
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+presence_store = PresenceStore(
+    flush_interval=getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 30),
+    retention=getattr(settings, 'PRESENCE_RETENTION', 3600),
+)
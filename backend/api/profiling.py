@@ -0,0 +1,276 @@
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from .metrics import COUNTERS
+
+logger = logging.getLogger(__name__)
+
+# Per-request timings, split into exclusive phases: time spent in queries is
+# booked to "db" even when auth or serialization issued them, and "app" is
+# whatever the other phases leave of the total.
+PHASES = ('auth', 'db', 'serialize', 'render', 'app')
+
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('started', 'durations', 'queries', 'db_time', '_open')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.db_time = 0.0
+        self._open = set()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def is_open(self, name):
+        return name in self._open
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        self.durations['db'] = self.db_time
+        self.durations['app'] = max(0.0, total - sum(self.durations[name] for name in PHASES if name != 'app'))
+        return total
+
+
+class _Phase:
+    """
+    Adds the time spent inside the block, less its queries, to ``name``.
+    Nested blocks of the same phase are only counted once.
+    """
+    __slots__ = ('timings', 'name', 'started', 'db_time')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        if self.name in self.timings._open:
+            self.started = None
+            return
+        self.timings._open.add(self.name)
+        self.db_time = self.timings.db_time
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.started is None:
+            return
+        elapsed = time.perf_counter() - self.started - (self.timings.db_time - self.db_time)
+        self.timings.durations[self.name] += max(0.0, elapsed)
+        self.timings._open.discard(self.name)
+
+
+class _NoPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_no_phase = _NoPhase()
+
+
+def current():
+    return _timings.get()
+
+
+def phase(name):
+    """
+    Context manager timing a phase of the current request; a no-op outside one.
+    """
+    timings = _timings.get()
+    return timings.phase(name) if timings is not None else _no_phase
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_time += time.perf_counter() - started
+        timings.queries += 1
+
+
+def install_query_timer(connection, **kwargs):
+    # Idempotent: connection_created fires again whenever the wrapper reconnects
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_timer)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with fixed upper bounds, keyed by label values.
+    """
+
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # One count per bucket plus +Inf, then the sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, values in sorted(series.items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_seconds = Histogram(
+    'kanban_request_duration_seconds',
+    'Request latency by route, method and phase (phase="total" is the whole request).',
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ('route', 'method', 'phase'),
+)
+request_queries = Histogram(
+    'kanban_request_db_queries',
+    'Database queries per request by route and method.',
+    (0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+    ('route', 'method'),
+)
+
+
+class RequestProfilingMiddleware:
+    """
+    Times auth, database (count and duration, through an execute wrapper),
+    serialization and rendering for every request. The numbers are sent back
+    in a ``Server-Timing`` header and aggregated into per-route histograms
+    served by ``/api/_metrics/``.
+
+    Streaming bodies are produced after the response leaves the middleware,
+    so their "total" is the time to the first byte.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self._finish(request, response, timings)
+
+    @staticmethod
+    def _start():
+        # Connections opened before this module was imported (e.g. the test database) missed the signal
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        timings = RequestTimings()
+        return timings, _timings.set(timings)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        timings = _timings.get()
+        if timings is not None:
+            render = timings.phase('render')
+            render.__enter__()
+            response.add_post_render_callback(lambda rendered: render.__exit__(None, None, None))
+        return response
+
+    @staticmethod
+    def _finish(request, response, timings):
+        total = timings.finish()
+        durations = timings.durations
+        response['Server-Timing'] = ', '.join(
+            [f'{name};dur={durations[name] * 1000:.2f}' for name in PHASES if name != 'db']
+            + [f'db;dur={durations["db"] * 1000:.2f};desc="{timings.queries} queries"', f'total;dur={total * 1000:.2f}']
+        )
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        request_seconds.observe((route, request.method, 'total'), total)
+        for name in PHASES:
+            request_seconds.observe((route, request.method, name), durations[name])
+        request_queries.observe((route, request.method), timings.queries)
+        return response
+
+
+def _counter_lines():
+    lines = []
+    for metric, field in (('kanban_cache_hits_total', 'hits'), ('kanban_cache_misses_total', 'misses')):
+        lines += [f"# HELP {metric} Cache and shortcut {field} since the worker started.", f"# TYPE {metric} counter"]
+        for name, counter in sorted(COUNTERS.items()):
+            lines.append(f'{metric}{{cache="{_escape(name)}"}} {counter.snapshot()[field]}')
+    return lines
+
+
+def prometheus_metrics(request):
+    """
+    Request histograms and cache counters of this worker in the Prometheus
+    text format, for scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``.
+    Without a METRICS_TOKEN the endpoint does not exist: behind a proxy every
+    client shares the proxy's address, so addresses cannot tell scrapers apart.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        logger.warning(f"Metrics scrape refused for {request.META.get('REMOTE_ADDR')}")
+        return HttpResponseForbidden()
+    lines = request_seconds.expose() + request_queries.expose() + _counter_lines()
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
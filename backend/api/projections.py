@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.fields import DateField, DateTimeField
+from rest_framework.settings import api_settings
+
+from . import profiling
+
+# Read-only projections for list and detail responses. Rows come from
+# ``.values()`` with the related names joined into the same query, and are
+# turned into exactly the dicts CardSerializer and TeamSerializer return:
+# same keys, key order and formatting, without model instances or a
+# serializer field call per value. Writes (and their responses) keep using
+# the serializers; a field added to one of them must be added here too.
+
+CARD_VALUES = (
+    'id', 'team_id', 'title', 'column', 'priority', 'assigned_to_id', 'assigned_to__name', 'start_date',
+    'deadline', 'progress', 'updated_by__name', 'sprint_start', 'sprint_finish', 'created_at', 'updated_at',
+)
+
+TEAM_VALUES = ('id', 'name', 'code', 'created_at', 'updated_at')
+
+
+def _datetime_formatter():
+    # DateTimeField.to_representation, with its settings lookups done once per response
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None or output_format.lower() != ISO_8601 or not settings.USE_TZ:
+        return DateTimeField().to_representation
+    tz = timezone.get_current_timezone()
+
+    def to_representation(value):
+        if not value:
+            return None
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return to_representation
+
+
+def _date_formatter():
+    output_format = api_settings.DATE_FORMAT
+    if output_format is None or output_format.lower() != ISO_8601:
+        return DateField().to_representation
+    return lambda value: value.isoformat() if value else None
+
+
+def card_values(queryset):
+    return queryset.values(*CARD_VALUES)
+
+
+def card_rows(rows):
+    """
+    ``CardSerializer(cards, many=True).data`` for ``card_values`` rows.
+    """
+    datetime_format = _datetime_formatter()
+    date_format = _date_formatter()
+    cards = []
+    append = cards.append
+    with profiling.phase('serialize'):
+        for row in rows:
+            assigned_to = row['assigned_to_id']
+            card = {
+                'id': row['id'],
+                'team': row['team_id'],
+                'title': row['title'],
+                'column': row['column'],
+                'priority': row['priority'],
+                'assigned_to': assigned_to,
+            }
+            # The serializer skips assigned_to_id (source assigned_to.id) when there is no assignee
+            if assigned_to is not None:
+                card['assigned_to_id'] = assigned_to
+            card['assigned_to_name'] = row['assigned_to__name']
+            card['start_date'] = date_format(row['start_date'])
+            card['deadline'] = date_format(row['deadline'])
+            card['progress'] = row['progress']
+            card['updated_by'] = row['updated_by__name']
+            card['sprint_start'] = datetime_format(row['sprint_start'])
+            card['sprint_finish'] = datetime_format(row['sprint_finish'])
+            card['created_at'] = datetime_format(row['created_at'])
+            card['updated_at'] = datetime_format(row['updated_at'])
+            append(card)
+    return cards
+
+
+def card_row(row):
+    return card_rows([row])[0]
+
+
+def team_values(queryset):
+    return queryset.values(*TEAM_VALUES)
+
+
+def team_rows(rows, team_rosters):
+    """
+    ``TeamSerializer(teams, many=True).data`` for ``team_values`` rows, with
+    members from ``team_rosters`` (api/roster.py).
+    """
+    datetime_format = _datetime_formatter()
+    with profiling.phase('serialize'):
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'code': row['code'],
+                'members': [
+                    {'id': profile_id, 'name': name, 'firebase_uid': firebase_uid}
+                    for profile_id, name, firebase_uid in team_rosters[row['id']]
+                ],
+                'created_at': datetime_format(row['created_at']),
+                'updated_at': datetime_format(row['updated_at']),
+            }
+            for row in rows
+        ]
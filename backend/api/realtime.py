@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import secrets
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import membership
+from .firebase_auth import aauthenticate_token
+
+logger = logging.getLogger(__name__)
+
+# Sentinel put on a subscriber's queue when it fell too far behind
+OVERFLOW = object()
+
+
+class Broker(ABC):
+    """
+    Fan-out of team events to the connections streaming that team.
+
+    ``publish`` is called from request threads after the write committed;
+    ``subscribe`` and ``unsubscribe`` are called on the event loop serving the
+    stream. A broker for multi-worker deployments (Redis pub/sub, Postgres
+    LISTEN/NOTIFY, ...) implements these methods and is selected with
+    ``REALTIME_BROKER``.
+    """
+
+    @abstractmethod
+    def publish(self, team_id, event):
+        pass
+
+    @abstractmethod
+    def subscribe(self, team_id):
+        """
+        Returns a ``Subscription`` for ``team_id``; the caller must ``close()`` it.
+        """
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """
+        Stops delivering to ``subscription``; called again after that is a no-op.
+        """
+
+
+class Subscription:
+    def __init__(self, broker, team_id, maxsize):
+        self.broker = broker
+        self.team_id = team_id
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+
+    def deliver(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is not keeping up; tell it to resync and stop feeding it
+            self.overflowed = True
+            self.broker.unsubscribe(self)
+            self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(Broker):
+    """
+    Delivers events to the connections served by this process only. Enough for
+    a single ASGI worker; with several workers use a shared broker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, team_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(team_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The loop serving this connection has shut down
+                self.unsubscribe(subscription)
+
+    def subscribe(self, team_id):
+        subscription = Subscription(self, team_id, settings.REALTIME_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.setdefault(team_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.team_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.team_id]
+
+    def subscriber_count(self, team_id):
+        with self._lock:
+            return len(self._subscriptions.get(team_id, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def publish(team_id, event_type, data):
+    """
+    Broadcasts ``{"type": event_type, "data": data}`` to the team once the
+    current transaction commits, so clients never see rolled-back writes.
+    """
+    event = {'type': event_type, 'data': data}
+
+    def send():
+        try:
+            get_broker().publish(int(team_id), event)
+        except Exception as e:
+            logger.error(f"Failed to publish {event_type} for team {team_id}: {str(e)}")
+
+    transaction.on_commit(send)
+
+
+def format_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+# EventSource cannot send an Authorization header, and a bearer token in the
+# query string would end up in access logs. Browsers instead get a stream
+# ticket from POST /api/teams/<id>/events/ticket/: signed, bound to the user
+# and team, valid for REALTIME_TICKET_TTL seconds and redeemable once.
+TICKET_SALT = 'api.realtime.stream-ticket'
+
+
+def issue_ticket(user, team_id):
+    return signing.dumps(
+        {'user': user.pk, 'team': int(team_id), 'nonce': secrets.token_urlsafe(12)}, salt=TICKET_SALT
+    )
+
+
+async def aredeem_ticket(ticket, team_id):
+    """
+    The user a valid, unused ticket for ``team_id`` was issued to, or ``None``.
+    """
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.REALTIME_TICKET_TTL)
+    except signing.BadSignature:
+        return None
+    if payload['team'] != int(team_id):
+        return None
+    # add() only succeeds for the first redemption
+    if not cache.add(f"realtime:ticket-used:{payload['nonce']}", True, settings.REALTIME_TICKET_TTL):
+        return None
+    return await User.objects.filter(pk=payload['user'], is_active=True).afirst()
+
+
+async def _authenticate(request, pk):
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return await aauthenticate_token(auth_header.split(' ')[1])
+    ticket = request.GET.get('ticket')
+    if not ticket:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    user = await aredeem_ticket(ticket, pk)
+    if user is None:
+        raise AuthenticationFailed('Invalid or expired stream ticket')
+    return user
+
+
+def _ends_stream(event, profile_id):
+    # The subscriber was removed from the team, or the team is gone
+    return event['type'] == 'team.deleted' or (event['type'] == 'member.left' and event['data'].get('id') == profile_id)
+
+
+async def team_events(request, pk):
+    """
+    Server-Sent Events stream of a team's card and membership changes.
+    Needs the ASGI application; the stream stays open until the client
+    disconnects or leaves the team. After a ``resync`` event the client
+    should catch up through ``/api/cards/changes/`` and reconnect.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the endless stream would hold a worker for as long as the client stays
+        return JsonResponse({"detail": "Event streams are only served by the ASGI application"}, status=501)
+    try:
+        user = await _authenticate(request, pk)
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    if not await membership.ais_member(user, pk):
+        logger.warning(f"User {user.username} is not a member of team {pk}")
+        return JsonResponse({"detail": "You are not a member of this team"}, status=403)
+    profile_id = await membership.aprofile_id_for_user(user)
+
+    async def stream():
+        # Subscribing inside the generator ties the subscription to the response being consumed
+        subscription = get_broker().subscribe(pk)
+        try:
+            yield f"retry: {settings.REALTIME_RETRY_MS}\n" + format_event('ready', {'team': pk})
+            while True:
+                try:
+                    event = await subscription.get(settings.REALTIME_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Also catches removals whose event was published by another worker
+                    if not await membership.ais_member(user, pk):
+                        logger.info(f"Closing the event stream of team {pk} for {user.username}: no longer a member")
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if event is OVERFLOW:
+                    yield format_event('resync', {'team': pk})
+                    return
+                yield format_event(event['type'], event['data'])
+                if _ends_stream(event, profile_id):
+                    return
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
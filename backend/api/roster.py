@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .db_routing import primary_reads
+from .models import TeamMember
+from .versioning import cache_is_shared, cache_timeout, team_version, team_versions
+
+# A team's roster is the denormalized list of (profile id, name, firebase uid)
+# rows TeamSerializer returns as ``members``. It is cached under the team
+# version, which api/signals.py bumps when a TeamMember or a member's name
+# changes; without a shared cache other workers only see the bump in their
+# own cache, so rosters are then kept briefly (versioning.cache_timeout).
+
+
+def _roster_key(team_id, version):
+    return f"team:roster:{team_id}:{version}"
+
+
+def rosters(team_ids):
+    """
+    Maps each team id to its roster. Cache misses are loaded with one query.
+    """
+    versions = team_versions({int(team_id) for team_id in team_ids})
+    keys = {_roster_key(team_id, version): team_id for team_id, version in versions.items()}
+    found = {keys[key]: roster for key, roster in cache.get_many(keys).items()}
+    missing = versions.keys() - found.keys()
+    if missing:
+        loaded = {team_id: [] for team_id in missing}
+        with primary_reads():
+            for team_id, profile_id, name, firebase_uid in TeamMember.objects.filter(team_id__in=missing).order_by(
+                'id'
+            ).values_list('team_id', 'user_profile_id', 'user_profile__name', 'user_profile__user__username'):
+                loaded[team_id].append((profile_id, name, firebase_uid))
+        cache.set_many(
+            {_roster_key(team_id, versions[team_id]): roster for team_id, roster in loaded.items()},
+            cache_timeout(settings.TEAM_ROSTER_CACHE_TIMEOUT)
+        )
+        found.update(loaded)
+    return found
+
+
+async def arosters(team_ids):
+    """
+    Async ``rosters``: the same cache entries, misses loaded with the async ORM.
+    """
+    versions = team_versions({int(team_id) for team_id in team_ids})
+    keys = {_roster_key(team_id, version): team_id for team_id, version in versions.items()}
+    found = {keys[key]: roster for key, roster in cache.get_many(keys).items()}
+    missing = versions.keys() - found.keys()
+    if missing:
+        loaded = {team_id: [] for team_id in missing}
+        with primary_reads():
+            async for team_id, profile_id, name, firebase_uid in TeamMember.objects.filter(
+                team_id__in=missing
+            ).order_by('id').values_list('team_id', 'user_profile_id', 'user_profile__name', 'user_profile__user__username'):
+                loaded[team_id].append((profile_id, name, firebase_uid))
+        cache.set_many(
+            {_roster_key(team_id, versions[team_id]): roster for team_id, roster in loaded.items()},
+            cache_timeout(settings.TEAM_ROSTER_CACHE_TIMEOUT)
+        )
+        found.update(loaded)
+    return found
+
+
+def roster(team_id):
+    return rosters([team_id])[int(team_id)]
+
+
+def _member_state():
+    # Leaving lowers the count, joining raises the newest membership id and
+    # renaming moves the profile's updated_at
+    return {'members': Count('id'), 'newest': Max('id'), 'renamed': Max('user_profile__updated_at')}
+
+
+def roster_validator(team_id):
+    """
+    A value that changes whenever the team's roster does, for ETags. The
+    team version with a shared cache; otherwise a bump made by another
+    worker never reaches this worker's version, so the state is read from
+    the database.
+    """
+    if cache_is_shared():
+        return team_version(team_id)
+    with primary_reads():
+        return tuple(TeamMember.objects.filter(team_id=team_id).aggregate(**_member_state()).values())
+
+
+async def aroster_validator(team_id):
+    if cache_is_shared():
+        return team_version(team_id)
+    with primary_reads():
+        return tuple((await TeamMember.objects.filter(team_id=team_id).aaggregate(**_member_state())).values())
@@ -0,0 +1,299 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, router
+from django.db.models import OuterRef, Subquery
+from django.utils.module_loading import import_string
+
+from .models import Card, CardTombstone, Team
+
+logger = logging.getLogger(__name__)
+
+# Card title search. Queries are split into words; every word must match a
+# word of the title and the last one also matches as a prefix, so results
+# narrow while the user types. Three backends rank the matches:
+#   - SQLite: an FTS5 index kept in sync with api_card by triggers
+#   - MySQL: a FULLTEXT index on api_card.title (boolean mode)
+#   - anything else: an in-process inverted index per team
+MAX_TERMS = 8
+TOKEN_RE = re.compile(r'\w+')
+
+FTS_TABLE = 'api_card_search'
+MYSQL_INDEX = 'card_title_fulltext'
+
+# External-content FTS5 table over api_card: only the index is stored. The
+# team column is indexed so the team filter is part of the MATCH.
+SQLITE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "title, team_id, content='api_card', content_rowid='id', "
+    "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_TRIGGERS_SQL = (
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON api_card BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, team_id) VALUES (new.id, new.title, new.team_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON api_card BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, team_id) VALUES ('delete', old.id, old.title, old.team_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, team_id ON api_card
+    WHEN old.title IS NOT new.title OR old.team_id IS NOT new.team_id BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, team_id) VALUES ('delete', old.id, old.title, old.team_id);
+        INSERT INTO {FTS_TABLE}(rowid, title, team_id) VALUES (new.id, new.title, new.team_id);
+    END""",
+)
+
+
+def tokenize(text):
+    # Lower-cased words without diacritics, like FTS5's unicode61 tokenizer
+    text = unicodedata.normalize('NFKD', text.lower())
+    return TOKEN_RE.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def parse_query(q):
+    """
+    ``[(word, is_prefix), ...]``: the last word is a prefix unless the query
+    ends with a space (the user finished typing it).
+    """
+    words = tokenize(q)[:MAX_TERMS]
+    return [(word, index == len(words) - 1 and not q[-1:].isspace()) for index, word in enumerate(words)]
+
+
+def _sqlite_table_exists(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def install_index(conn):
+    """
+    Creates the text index for ``conn``'s database and fills it. Used by the
+    migration; SQLite builds without FTS5 are left to the fallback backend.
+    """
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            try:
+                cursor.execute(SQLITE_TABLE_SQL)
+            except OperationalError as e:
+                logger.warning(f"SQLite FTS5 unavailable, card search uses the in-process index: {e}")
+                return
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            for sql in SQLITE_TRIGGERS_SQL:
+                cursor.execute(sql)
+        elif conn.vendor == 'mysql':
+            cursor.execute(f"CREATE FULLTEXT INDEX {MYSQL_INDEX} ON api_card (title)")
+
+
+def drop_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for suffix in ('insert', 'delete', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif conn.vendor == 'mysql':
+            cursor.execute(f"DROP INDEX {MYSQL_INDEX} ON api_card")
+
+
+def ensure_triggers(conn):
+    """
+    Recreates the SQLite triggers after migrations: rebuilding api_card to
+    alter it drops them, while the rows (and so the index) are kept.
+    """
+    if conn.vendor == 'sqlite' and _sqlite_table_exists(conn):
+        with conn.cursor() as cursor:
+            for sql in SQLITE_TRIGGERS_SQL:
+                cursor.execute(sql)
+
+
+class SQLiteFTSBackend:
+    def search(self, team_ids, terms, limit):
+        # Words are \w+ tokens, so quoting them is enough to keep FTS5 operators out
+        title = ' AND '.join(f'"{word}"' + ('*' if prefix else '') for word, prefix in terms)
+        teams = ' OR '.join(f'"{int(team_id)}"' for team_id in team_ids)
+        # FTS5 yields matches in rowid order for free; scoring them is what
+        # costs, so only the newest CARD_SEARCH_CANDIDATES are ranked
+        with connections[router.db_for_read(Card)].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM ("
+                f"SELECT rowid, bm25({FTS_TABLE}, 1.0, 0.0) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY rowid DESC LIMIT %s"
+                f") ORDER BY score, rowid DESC LIMIT %s",
+                [f'team_id : ({teams}) AND title : ({title})', settings.CARD_SEARCH_CANDIDATES, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class MySQLFullTextBackend:
+    """
+    Words shorter than innodb_ft_min_token_size (3 by default) and InnoDB
+    stopwords are not indexed; lower the setting for shorter card titles.
+    """
+
+    def search(self, team_ids, terms, limit):
+        against = ' '.join(f'+{word}*' if prefix else f'+{word}' for word, prefix in terms)
+        placeholders = ', '.join(['%s'] * len(team_ids))
+        with connections[router.db_for_read(Card)].cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM api_card WHERE team_id IN ({placeholders}) "
+                "AND MATCH (title) AGAINST (%s IN BOOLEAN MODE) "
+                "ORDER BY MATCH (title) AGAINST (%s IN BOOLEAN MODE) DESC, id DESC LIMIT %s",
+                [*team_ids, against, against, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TeamIndex:
+    """
+    Inverted index of one team's card titles: word -> card ids, with the
+    words sorted so a prefix is a contiguous range, plus each card's words
+    for scoring.
+    """
+    # BM25 parameters, as used by FTS5's bm25()
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, rows):
+        postings = defaultdict(list)
+        self.card_words = {}
+        for card_id, title in rows:
+            words = tokenize(title)
+            self.card_words[card_id] = words
+            for word in set(words):
+                postings[word].append(card_id)
+        self.postings = dict(postings)
+        self.words = sorted(postings)
+        self.size = len(self.card_words)
+        self.average_length = sum(map(len, self.card_words.values())) / self.size if self.size else 1
+
+    def _expand(self, word, prefix):
+        if not prefix:
+            return [word] if word in self.postings else []
+        start = bisect_left(self.words, word)
+        end = bisect_left(self.words, word + '\U0010ffff', start)
+        return self.words[start:end]
+
+    def _idf(self, word):
+        matches = len(self.postings[word])
+        return math.log(1 + (self.size - matches + 0.5) / (matches + 0.5))
+
+    def score(self, terms, candidates):
+        """
+        ``{card id: score}`` of the newest ``candidates`` cards matching every
+        term. A term scores the BM25 weight of the rarest title word it
+        matched, so short titles and rare words rank first.
+        """
+        expanded = sorted(
+            (sum(len(self.postings[match]) for match in matches), matches)
+            for matches in (self._expand(word, prefix) for word, prefix in terms)
+        )
+        matching = None
+        for _, matches in expanded:
+            if matching is None:
+                matching = set().union(*(self.postings[match] for match in matches))
+            else:
+                matching = {card_id for match in matches for card_id in self.postings[match] if card_id in matching}
+            if not matching:
+                return {}
+        if len(matching) > candidates:
+            # Ids come out of the set nearly sorted, which is heapq.nlargest's worst case
+            matching = sorted(matching)[-candidates:]
+
+        scores = {}
+        for card_id in matching:
+            words = self.card_words[card_id]
+            norm = (self.k1 + 1) / (1 + self.k1 * (1 - self.b + self.b * len(words) / self.average_length))
+            scores[card_id] = norm * sum(
+                max(
+                    self._idf(card_word) for card_word in words
+                    if card_word == word or (prefix and card_word.startswith(word))
+                )
+                for word, prefix in terms
+            )
+        return scores
+
+
+class InvertedIndexBackend:
+    """
+    Keeps the indexes of the ``CARD_SEARCH_FALLBACK_TEAMS`` most recently
+    searched teams in memory. A team's index is rebuilt once its newest card
+    update or deletion (tombstone) changes, which one indexed query checks
+    on every search.
+    """
+
+    def __init__(self):
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, team_id, stamp):
+        with self._lock:
+            entry = self._indexes.get(team_id)
+            if entry is not None and entry[0] == stamp:
+                self._indexes.move_to_end(team_id)
+                return entry[1]
+        index = TeamIndex(
+            Card.objects.filter(team_id=team_id).order_by('id').values_list('id', 'title').iterator(chunk_size=5000)
+        )
+        with self._lock:
+            self._indexes[team_id] = (stamp, index)
+            self._indexes.move_to_end(team_id)
+            while len(self._indexes) > settings.CARD_SEARCH_FALLBACK_TEAMS:
+                self._indexes.popitem(last=False)
+        return index
+
+    def search(self, team_ids, terms, limit):
+        # Each subquery is a single index seek, unlike a count over the board
+        stamps = Team.objects.filter(id__in=team_ids).annotate(
+            last_update=Subquery(
+                Card.objects.filter(team_id=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+            ),
+            last_delete=Subquery(
+                CardTombstone.objects.filter(team_id=OuterRef('pk')).order_by('-deleted_at').values('deleted_at')[:1]
+            ),
+        ).values_list('id', 'last_update', 'last_delete')
+        scores = {}
+        for team_id, last_update, last_delete in stamps:
+            scores.update(
+                self._index(team_id, (last_update, last_delete)).score(terms, settings.CARD_SEARCH_CANDIDATES)
+            )
+        # Ties go to the newest card, as in the database backends
+        return heapq.nlargest(limit, scores, key=lambda card_id: (scores[card_id], card_id))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    ``CARD_SEARCH_BACKEND`` when set, otherwise the text index of the
+    database in use (falling back to the in-process index).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.CARD_SEARCH_BACKEND:
+                    _backend = import_string(settings.CARD_SEARCH_BACKEND)()
+                elif connection.vendor == 'sqlite' and _sqlite_table_exists(connection):
+                    _backend = SQLiteFTSBackend()
+                elif connection.vendor == 'mysql':
+                    _backend = MySQLFullTextBackend()
+                else:
+                    _backend = InvertedIndexBackend()
+                logger.info(f"Card search backend: {type(_backend).__name__}")
+    return _backend
+
+
+def search_cards(team_ids, terms, limit):
+    """
+    Ids of the best-matching cards of ``team_ids``, best first.
+    """
+    if not terms or not team_ids:
+        return []
+    return get_backend().search(sorted(team_ids), terms, limit)
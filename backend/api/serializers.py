@@ -1,13 +1,42 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import UserProfile, Team, Card, TeamMember, WorkDay
+from . import membership, profiling
+from .roster import roster
+from .uploads import release_profile_picture, schedule_thumbnails, spool_upload, store_profile_picture, thumbnail_name
 import base64
 import uuid
-from django.core.files.base import ContentFile
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+class ProfiledListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        with profiling.phase('serialize'):
+            return super().to_representation(data)
+
+
+class ProfiledSerializerMixin:
+    """
+    Books representation time to the request's "serialize" phase: once per
+    list for ``many=True``, so large boards pay for one timer, not one per card.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        kwargs['child'] = cls()
+        return ProfiledListSerializer(*args, **kwargs)
+
+    def to_representation(self, instance):
+        if isinstance(self.parent, ProfiledListSerializer):
+            # The list already times its children
+            return super().to_representation(instance)
+        with profiling.phase('serialize'):
+            return super().to_representation(instance)
+
+
 class UserSerializer(serializers.ModelSerializer):
     profile = serializers.SerializerMethodField()
 
@@ -35,9 +64,10 @@ class UserSerializer(serializers.ModelSerializer):
                 'profile_pic': None,
             }
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     email = serializers.EmailField(source='user.email', read_only=True)
     profile_pic = serializers.SerializerMethodField()
+    profile_pic_thumbnails = serializers.SerializerMethodField()
     profile_pic_data = serializers.CharField(write_only=True, required=False)
 
     class Meta:
@@ -48,6 +78,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'position',
             'role',
             'profile_pic',
+            'profile_pic_thumbnails',
             'profile_pic_data',
             'email',
             'is_active',
@@ -62,6 +93,16 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return self.context['request'].build_absolute_uri(obj.profile_pic.url)
         return None
 
+    def get_profile_pic_thumbnails(self, obj):
+        # Only pictures uploaded through /api/profile/picture/ have thumbnails
+        if not obj.profile_pic or thumbnail_name(obj.profile_pic.name, 0) is None:
+            return {}
+        request = self.context['request']
+        return {
+            str(size): request.build_absolute_uri(settings.MEDIA_URL + thumbnail_name(obj.profile_pic.name, size))
+            for size in settings.PROFILE_PIC_THUMBNAIL_SIZES
+        }
+
     def validate(self, data):
         if 'name' in data and not data['name'].strip():
             raise serializers.ValidationError({"name": "Name cannot be empty"})
@@ -78,7 +119,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             try:
                 format, imgstr = value.split(';base64,')
                 ext = format.split('/')[-1]
-                if len(imgstr) * 3/4 > 5 * 1024 * 1024:
+                if len(imgstr) * 3/4 > settings.PROFILE_PIC_MAX_BYTES:
                     raise serializers.ValidationError("Profile picture size should not exceed 5MB")
                 return value
             except Exception:
@@ -87,17 +128,17 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         profile_pic_data = validated_data.pop('profile_pic_data', None)
+        previous_pic = None
         if profile_pic_data:
+            # Stored like multipart uploads: content-addressed, so possibly shared
             try:
                 format, imgstr = profile_pic_data.split(';base64,')
                 ext = format.split('/')[-1]
-                file_name = f"{uuid.uuid4()}.{ext}"
-                data = ContentFile(base64.b64decode(imgstr))
-                if instance.profile_pic:
-                    instance.profile_pic.delete()
-                instance.profile_pic.save(file_name, data, save=False)
+                name = store_profile_picture(spool_upload(base64.b64decode(imgstr), f"{uuid.uuid4()}.{ext}"))
             except Exception as e:
                 raise serializers.ValidationError(f"Error processing profile picture: {str(e)}")
+            previous_pic = instance.profile_pic.name or None
+            instance.profile_pic.name = name
 
         instance.name = validated_data.get('name', instance.name)
         instance.role = validated_data.get('role', instance.role)
@@ -107,8 +148,22 @@ class UserProfileSerializer(serializers.ModelSerializer):
             instance.position = validated_data.get('position', instance.position)
 
         instance.save()
+        if profile_pic_data:
+            if previous_pic != instance.profile_pic.name:
+                release_profile_picture(previous_pic)
+            schedule_thumbnails(instance.profile_pic.name)
         return instance
 
+class ProfileReadSerializer(UserProfileSerializer):
+    """
+    The caller's profile as GET /api/profile/ returns it. Without last_login:
+    every read records presence and so moves it, which would change the
+    response (and its ETag) on every request.
+    """
+
+    class Meta(UserProfileSerializer.Meta):
+        fields = tuple(field for field in UserProfileSerializer.Meta.fields if field != 'last_login')
+
 class TeamMemberSerializer(serializers.ModelSerializer):
     user_profile_name = serializers.CharField(source='user_profile.name', read_only=True)
 
@@ -117,7 +172,7 @@ class TeamMemberSerializer(serializers.ModelSerializer):
         fields = ['id', 'team', 'user_profile', 'user_profile_name', 'member_name']
         read_only_fields = ['id', 'team', 'user_profile', 'user_profile_name']
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     members = serializers.SerializerMethodField()
     code = serializers.CharField(max_length=6, required=True)
 
@@ -127,8 +182,11 @@ class TeamSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
 
     def get_members(self, obj):
-        team_members = obj.teammember.all()
-        return [{'id': tm.user_profile.id, 'name': tm.user_profile.name, 'firebase_uid': tm.user_profile.user.username} for tm in team_members]
+        # List views pass every team's roster in the context in one go
+        team_roster = self.context.get('rosters', {}).get(obj.id)
+        if team_roster is None:
+            team_roster = roster(obj.id)
+        return [{'id': profile_id, 'name': name, 'firebase_uid': firebase_uid} for profile_id, name, firebase_uid in team_roster]
 
     def validate(self, data):
         if 'name' in data and not data['name'].strip():
@@ -154,7 +212,7 @@ class TeamSerializer(serializers.ModelSerializer):
         )
         return team
 
-class CardSerializer(serializers.ModelSerializer):
+class CardSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     assigned_to_name = serializers.SerializerMethodField()
     updated_by = serializers.SlugRelatedField(
         read_only=True,
@@ -205,8 +263,9 @@ class CardSerializer(serializers.ModelSerializer):
             if not isinstance(progress, int) or progress < 0 or progress > 100:
                 raise serializers.ValidationError({"progress": "Progress must be an integer between 0 and 100"})
         if 'assigned_to' in data and data['assigned_to']:
-            team_id = data.get('team') or (self.instance.team.id if self.instance else None)
-            if team_id and not TeamMember.objects.filter(team_id=team_id, user_profile=data['assigned_to']).exists():
+            team = data.get('team')
+            team_id = team.id if team else (self.instance.team_id if self.instance else None)
+            if team_id and not membership.is_profile_member(data['assigned_to'].id, team_id):
                 raise serializers.ValidationError({"assigned_to": "Assigned user must be a team member"})
         sprint_start = data.get('sprint_start')
         sprint_finish = data.get('sprint_finish')
@@ -214,8 +273,33 @@ class CardSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"sprint_finish": "Sprint finish must be after sprint start"})
         return data
 
-class WorkDaySerializer(serializers.ModelSerializer):
+class CardBulkChangeSerializer(serializers.Serializer):
+    """
+    One item of a bulk card update. Only shape and field values are checked here;
+    team membership and role checks are done by the view for the whole batch.
+    """
+    id = serializers.IntegerField()
+    title = serializers.CharField(max_length=255, required=False)
+    column = serializers.ChoiceField(choices=Card.COLUMN_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Card.PRIORITY_CHOICES, required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+    start_date = serializers.DateField(required=False, allow_null=True)
+    deadline = serializers.DateField(required=False, allow_null=True)
+    progress = serializers.IntegerField(required=False, min_value=0, max_value=100)
+    sprint_start = serializers.DateTimeField(required=False, allow_null=True)
+    sprint_finish = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if 'title' in data and not data['title'].strip():
+            raise serializers.ValidationError({"title": "Card title cannot be empty"})
+        sprint_start = data.get('sprint_start')
+        sprint_finish = data.get('sprint_finish')
+        if sprint_start and sprint_finish and sprint_start > sprint_finish:
+            raise serializers.ValidationError({"sprint_finish": "Sprint finish must be after sprint start"})
+        return data
+
+class WorkDaySerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = WorkDay
-        fields = ['id', 'user_profile', 'start_time', 'end_time', 'working_hours', 'created_at']
-        read_only_fields = ['id', 'user_profile', 'created_at', 'working_hours']
\ No newline at end of file
+        fields = ['id', 'user_profile', 'start_time', 'end_time', 'working_hours', 'duration_seconds', 'created_at']
+        read_only_fields = ['id', 'user_profile', 'created_at', 'working_hours', 'duration_seconds']
\ No newline at end of file
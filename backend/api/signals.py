@@ -1,23 +1,17 @@
-from django.db.models.signals import post_save, pre_delete
-from django.dispatch import receiver
-from django.db import transaction
-from .models import User, UserProfile
-
-# Signal to create a UserProfile automatically when a new User is created
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """
-    Creates a UserProfile automatically when a new User is registered.
-    Defaults role to 'Team Member' if not specified.
-    """
-    if created:
-        UserProfile.objects.get_or_create(
-            user=instance,
-            defaults={
-                'role': 'Team Member',  # Default role
-                'position': '',        # Empty by default
-            }
-        )
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, post_migrate, post_save, pre_delete, pre_save, post_delete
+from django.dispatch import receiver, Signal
+from django.db import connections, transaction
+from .models import User, UserProfile, Team, TeamMember, Card
+from . import burndown, membership, search
+from .versioning import BOARD, TEAM, bump_team_versions
+
+# Sent by card writes that bypass Model.save() (e.g. bulk_update) with
+# ``cards``: the written Card instances and
+# ``previous``: {card_id: (team_id, column, progress)} as they were before the write
+cards_bulk_updated = Signal()
+
+# Profiles of new users are created by the post_save receiver in models.py
 
 # Signal to delete the UserProfile when a User is deleted (optional)
 @receiver(pre_delete, sender=User)
@@ -30,11 +24,132 @@ def delete_user_profile(sender, instance, **kwargs):
     except UserProfile.DoesNotExist:
         pass  # Profile doesn't exist, do nothing
 
-# Optional: Add more signals (e.g., updating profile on user changes)
-@receiver(post_save, sender=User)
-def update_user_profile_on_email_change(sender, instance, **kwargs):
+def _card_state(card):
+    return (card.team_id, card.column, card.progress)
+
+def _deleted_with_team(origin):
+    return isinstance(origin, Team) or (isinstance(origin, QuerySet) and origin.model is Team)
+
+def _record_burndown(transitions):
+    """
+    Feeds ``(previous, current)`` card states into the burndown snapshots of each team involved.
+    """
+    by_team = {}
+    for previous, current in transitions:
+        if previous and current and previous[0] == current[0]:
+            by_team.setdefault(current[0], []).append((previous[1:], current[1:]))
+            continue
+        if previous:
+            by_team.setdefault(previous[0], []).append((previous[1:], None))
+        if current:
+            by_team.setdefault(current[0], []).append((None, current[1:]))
+    for team_id, changes in by_team.items():
+        burndown.apply_card_changes(team_id, changes)
+
+@receiver(post_init, sender=Card)
+def remember_loaded_card_state(sender, instance, **kwargs):
+    # Lets pre_save know the stored column/progress without a query
+    if instance.pk is None or instance.get_deferred_fields() & {'team_id', 'column', 'progress'}:
+        instance._loaded_state = None
+    else:
+        instance._loaded_state = _card_state(instance)
+
+@receiver(pre_save, sender=Card)
+def remember_card_state(sender, instance, raw=False, **kwargs):
+    """
+    Keeps the stored column/progress of a card so post_save can compute the delta.
+    """
+    instance._previous_state = None
+    if not raw and instance.pk is not None:
+        instance._previous_state = getattr(instance, '_loaded_state', None)
+        if instance._previous_state is None:
+            # Deferred fields: read what is stored
+            instance._previous_state = Card.objects.filter(pk=instance.pk).values_list(
+                'team_id', 'column', 'progress'
+            ).first()
+    # What is stored once this save goes through
+    instance._loaded_state = _card_state(instance)
+
+@receiver(post_save, sender=Card)
+def update_burndown_on_card_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _record_burndown([(getattr(instance, '_previous_state', None), _card_state(instance))])
+
+@receiver(post_delete, sender=Card)
+def update_burndown_on_card_delete(sender, instance, origin=None, **kwargs):
+    # Snapshots of a deleted team are removed along with it
+    if _deleted_with_team(origin):
+        return
+    _record_burndown([(_card_state(instance), None)])
+
+@receiver(cards_bulk_updated)
+def update_burndown_on_bulk_update(sender, cards, previous, **kwargs):
+    _record_burndown([(previous.get(card.id), _card_state(card)) for card in cards])
+
+def _bump_versions(team_ids, kind):
+    bump_team_versions(team_ids, kind)
+    # Until the transaction commits, a reader can still cache the old rows
+    # under the new version: bump again once they are visible
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_team_versions(team_ids, kind))
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def bump_board_version_on_card_change(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Retires the cached facets and card list of the card's team (and of its
+    previous team, if it moved).
+    """
+    # A deleted team bumps its versions once, not once per card
+    if raw or _deleted_with_team(origin):
+        return
+    previous = getattr(instance, '_previous_state', None)
+    _bump_versions({instance.team_id} | ({previous[0]} if previous else set()), BOARD)
+
+@receiver(cards_bulk_updated)
+def bump_board_versions_on_bulk_update(sender, cards, previous, **kwargs):
+    team_ids = {card.team_id for card in cards} | {state[0] for state in previous.values()}
+    _bump_versions(team_ids, BOARD)
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def invalidate_team_membership(sender, instance, origin=None, **kwargs):
+    """
+    Drops the cached team set of the profile whose membership changed and
+    retires the team's cached roster.
+    """
+    membership.invalidate_profile(instance.user_profile_id)
+    if not _deleted_with_team(origin):
+        _bump_versions([instance.team_id], TEAM)
+
+@receiver(post_delete, sender=Team)
+def bump_versions_on_team_delete(sender, instance, **kwargs):
+    # Card and TeamMember rows deleted along with the team leave this to us
+    _bump_versions([instance.id], TEAM)
+    _bump_versions([instance.id], BOARD)
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_name(sender, instance, **kwargs):
+    # Lets the post_save receiver tell a rename apart without a query
+    instance._loaded_name = instance.name
+
+@receiver(post_save, sender=UserProfile)
+def bump_rosters_on_rename(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    if instance.name != instance._loaded_name:
+        _bump_versions(membership.team_ids_for_profile(instance.id), TEAM)
+        instance._loaded_name = instance.name
+
+@receiver(post_delete, sender=UserProfile)
+def forget_user_profile_id(sender, instance, **kwargs):
+    membership.forget_user(instance.user_id)
+
+@receiver(post_migrate)
+def restore_card_search_triggers(sender, using, **kwargs):
     """
-    Example: Sync email changes to profile (if needed).
+    SQLite drops the card search triggers whenever a migration rebuilds api_card.
     """
-    if hasattr(instance, 'profile'):
-        pass  # Add logic here if needed (e.g., cache email in profile)
\ No newline at end of file
+    if sender.name == 'api':
+        search.ensure_triggers(connections[using])
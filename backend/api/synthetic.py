@@ -0,0 +1,153 @@
+import logging
+import random
+import secrets
+import string
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Card, Team, TeamMember, UserProfile, WorkDay
+from .worktime import duration_between, format_duration
+from . import burndown
+
+logger = logging.getLogger(__name__)
+
+# Synthetic users are named "<prefix>-<run>-<n>"; the Firebase uid is the
+# username, so the load replay harness can sign in as any of them.
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def _team_codes(rng, count):
+    codes = set()
+    while len(codes) < count:
+        candidates = {''.join(rng.choices(CODE_ALPHABET, k=6)) for _ in range(count - len(codes))}
+        taken = set(Team.objects.filter(code__in=candidates).values_list('code', flat=True))
+        codes |= candidates - taken
+    return list(codes)
+
+
+def _workday_spans(rng, days, today):
+    """
+    ``(start, end)`` of roughly five work days a week over the last ``days``
+    days, starting between 08:00 and 10:00 local time and lasting 6-9 hours.
+    """
+    spans = []
+    for offset in range(days, 0, -1):
+        if rng.random() > 5 / 7:
+            continue
+        day = today - timedelta(days=offset)
+        start = timezone.make_aware(datetime.combine(day, time(8))) + timedelta(minutes=rng.randrange(120))
+        spans.append((start, start + timedelta(seconds=rng.randrange(6 * 3600, 9 * 3600))))
+    return spans
+
+
+class SyntheticBoards:
+    """
+    Creates teams of synthetic users with cards and work-day history using
+    ``bulk_create``, one transaction per team. The first member of every team
+    is its Project Manager.
+
+    ``progress(kind, count)`` is called after every team.
+    """
+
+    def __init__(self, prefix='load', batch_size=1000, seed=None, progress=None):
+        self.rng = random.Random(seed)
+        # The run token keeps repeated runs (even with the same seed) from colliding
+        self.prefix = f"{prefix}-{secrets.token_hex(3)}"
+        self.batch_size = batch_size
+        self.progress = progress or (lambda kind, count: None)
+        self.counts = {'teams': 0, 'members': 0, 'cards': 0, 'workdays': 0}
+
+    def run(self, teams, members, cards, days):
+        codes = _team_codes(self.rng, teams)
+        for index, code in enumerate(codes):
+            with transaction.atomic():
+                team = self._team(index, code, members, cards, days)
+            # bulk_create skips the Card signals that keep the burndown current
+            burndown.snapshot_team(team.id)
+            self.counts['teams'] += 1
+            self.progress('teams', self.counts['teams'])
+        logger.info(f"Generated synthetic boards {self.prefix}: {self.counts}")
+        return {'prefix': self.prefix, **self.counts}
+
+    def _team(self, index, code, members, cards, days):
+        rng = self.rng
+        today = timezone.localdate()
+        usernames = [f"{self.prefix}-{index * members + n}" for n in range(members)]
+        spans = {username: _workday_spans(rng, days, today) for username in usernames}
+
+        # Re-read rather than trust bulk_create: MySQL does not return the new ids
+        User.objects.bulk_create(
+            [User(username=username, email=f"{username}@example.com") for username in usernames],
+            batch_size=self.batch_size
+        )
+        users = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user_id=users[username],
+                    name=f"Synthetic {username}",
+                    role='Project Manager' if n == 0 else 'Team Member',
+                    position='' if n == 0 else rng.choice(UserProfile.POSITION_CHOICES)[0],
+                    total_working_time=sum(duration_between(start, end) for start, end in spans[username]),
+                )
+                for n, username in enumerate(usernames)
+            ],
+            batch_size=self.batch_size
+        )
+        profiles = dict(UserProfile.objects.filter(user_id__in=users.values()).values_list('user__username', 'id'))
+        profile_ids = [profiles[username] for username in usernames]
+
+        team = Team.objects.create(name=f"Synthetic team {index + 1}", code=code)
+        TeamMember.objects.bulk_create(
+            [
+                TeamMember(team=team, user_profile_id=profiles[username], member_name=f"Synthetic {username}")
+                for username in usernames
+            ],
+            batch_size=self.batch_size
+        )
+        self.counts['members'] += len(usernames)
+
+        columns = [column for column, _ in Card.COLUMN_CHOICES]
+        priorities = [priority for priority, _ in Card.PRIORITY_CHOICES]
+        batch = []
+        for n in range(cards):
+            column = rng.choice(columns)
+            start_date = today - timedelta(days=rng.randrange(60))
+            sprint_start = None
+            if rng.random() < 0.3:
+                sprint_start = timezone.make_aware(datetime.combine(start_date, time(9)))
+            batch.append(Card(
+                team=team,
+                title=f"Synthetic task {n + 1}",
+                column=column,
+                priority=rng.choice(priorities),
+                assigned_to_id=rng.choice(profile_ids),
+                updated_by_id=profile_ids[0],
+                start_date=start_date,
+                deadline=start_date + timedelta(days=rng.randrange(1, 31)),
+                progress=100 if column == 'done' else rng.choice((0, 0, 25, 50, 75)),
+                sprint_start=sprint_start,
+                sprint_finish=sprint_start + timedelta(days=14) if sprint_start else None,
+            ))
+            if len(batch) >= self.batch_size:
+                Card.objects.bulk_create(batch)
+                batch = []
+        Card.objects.bulk_create(batch)
+        self.counts['cards'] += cards
+
+        workdays = [
+            WorkDay(
+                user_profile_id=profiles[username],
+                start_time=start,
+                end_time=end,
+                working_hours=format_duration(duration_between(start, end)),
+                duration_seconds=duration_between(start, end),
+            )
+            for username in usernames for start, end in spans[username]
+        ]
+        WorkDay.objects.bulk_create(workdays, batch_size=self.batch_size)
+        self.counts['workdays'] += len(workdays)
+        return team
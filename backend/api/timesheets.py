@@ -0,0 +1,103 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import WorkDay
+
+COLUMNS = [
+    'workday_id', 'member_id', 'member_name', 'firebase_uid', 'date',
+    'start_time', 'end_time', 'duration_seconds', 'working_hours',
+]
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the formatted line straight back,
+    so csv.writer can format rows without buffering them.
+    """
+
+    def write(self, value):
+        return value
+
+
+def timesheet_rows(team_id, start, end, member_ids=None):
+    """
+    Work days of the team's members that started between ``start`` and ``end``
+    (local dates, inclusive), one tuple per work day in COLUMNS order, oldest
+    first. Rows are read in keyset batches of ``TIMESHEET_CHUNK_SIZE`` on
+    ``(start_time, id)``, each its own query, so memory does not grow with the
+    range: MySQL's driver buffers a whole result even under ``.iterator()``.
+    """
+    workdays = WorkDay.objects.filter(
+        user_profile__teammember__team_id=team_id,
+        start_time__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        start_time__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+    if member_ids:
+        workdays = workdays.filter(user_profile_id__in=member_ids)
+    workdays = workdays.order_by('start_time', 'id').values_list(
+        'id', 'user_profile_id', 'user_profile__name', 'user_profile__user__username',
+        'start_time', 'end_time', 'duration_seconds', 'working_hours',
+    )
+    batch = list(workdays[:settings.TIMESHEET_CHUNK_SIZE])
+    while batch:
+        for workday_id, member_id, name, firebase_uid, start_time, end_time, duration, working_hours in batch:
+            start_time = timezone.localtime(start_time)
+            end_time = timezone.localtime(end_time) if end_time else None
+            yield (
+                workday_id, member_id, name, firebase_uid, start_time.date().isoformat(),
+                start_time.isoformat(), end_time.isoformat() if end_time else '',
+                duration if duration is not None else '', working_hours or '',
+            )
+        if len(batch) < settings.TIMESHEET_CHUNK_SIZE:
+            return
+        last_id, last_start = batch[-1][0], batch[-1][4]
+        batch = list(workdays.filter(
+            Q(start_time__gt=last_start) | Q(start_time=last_start, id__gt=last_id)
+        )[:settings.TIMESHEET_CHUNK_SIZE])
+
+
+def _batched(lines):
+    # One write per row would flood the server with tiny chunks
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= settings.TIMESHEET_CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        for field in ('end_time', 'duration_seconds', 'working_hours'):
+            if record[field] == '':
+                record[field] = None
+        yield json.dumps(record) + '\n'
+
+
+FORMATS = {
+    'csv': ('text/csv', 'csv', csv_lines),
+    'ndjson': ('application/x-ndjson', 'ndjson', ndjson_lines),
+}
+
+
+def stream_timesheet(output, team_id, start, end, member_ids=None):
+    """
+    Returns ``(content type, file extension, iterator of text chunks)``.
+    """
+    content_type, extension, lines = FORMATS[output]
+    return content_type, extension, _batched(lines(timesheet_rows(team_id, start, end, member_ids)))
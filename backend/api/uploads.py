@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Profile pictures are stored under the SHA-256 of their bytes, so identical
+# uploads share one file and its thumbnails:
+#   profile_pics/ab/abcdef....png
+#   profile_pics/thumbs/abcdef..._64.png
+PROFILE_PIC_DIR = 'profile_pics'
+CONTENT_ADDRESSED_NAME = re.compile(rf'^{PROFILE_PIC_DIR}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})\.\w+$')
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def _incoming_file():
+    incoming = os.path.join(settings.MEDIA_ROOT, PROFILE_PIC_DIR, '.incoming')
+    os.makedirs(incoming, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=incoming, delete=False)
+
+
+class HashedUploadedFile(UploadedFile):
+    """
+    An upload already written to disk under MEDIA_ROOT, with its SHA-256.
+    """
+
+    def __init__(self, path, sha256, name, content_type, size, charset=None, content_type_extra=None):
+        super().__init__(open(path, 'rb'), name, content_type, size, charset, content_type_extra)
+        self.temporary_path = path
+        self.sha256 = sha256
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.temporary_path):
+            os.remove(self.temporary_path)
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    Writes each chunk of an uploaded file straight to a temporary file next to
+    its final location, hashing as it goes, and skips the file as soon as it
+    grows past ``PROFILE_PIC_MAX_BYTES``. Nothing but the current chunk is
+    held in memory.
+
+    The view must call ``cleanup()`` when done (in a ``finally``): files of
+    other fields, and uploads it did not store, are removed then.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.too_large = False
+        self.file = None
+        self.uploads = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = _incoming_file()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.PROFILE_PIC_MAX_BYTES:
+            self.too_large = True
+            self._discard()
+            raise SkipFile()
+        self.file.write(raw_data)
+        self.sha256.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.file.close()
+        upload = HashedUploadedFile(
+            self.file.name, self.sha256.hexdigest(), self.file_name, self.content_type,
+            file_size, self.charset, self.content_type_extra
+        )
+        self.file = None
+        self.uploads.append(upload)
+        return upload
+
+    def upload_interrupted(self):
+        self.cleanup()
+
+    def cleanup(self):
+        # Stored uploads were moved away; discard() only closes them
+        self._discard()
+        for upload in self.uploads:
+            upload.discard()
+        self.uploads = []
+
+    def _discard(self):
+        if self.file is not None:
+            self.file.close()
+            if os.path.exists(self.file.name):
+                os.remove(self.file.name)
+            self.file = None
+
+
+def spool_upload(data, name, content_type=None):
+    """
+    A ``HashedUploadedFile`` of ``data`` (e.g. a decoded base64 picture), ready
+    for ``store_profile_picture``.
+    """
+    incoming = _incoming_file()
+    try:
+        incoming.write(data)
+    finally:
+        incoming.close()
+    return HashedUploadedFile(incoming.name, hashlib.sha256(data).hexdigest(), name, content_type, len(data))
+
+
+def store_profile_picture(upload):
+    """
+    Moves a verified upload to its content-addressed name and returns that
+    name (relative to MEDIA_ROOT). If the same picture was uploaded before, the
+    new copy is dropped and the existing file reused.
+    Raises ``ValueError`` when the upload is not a supported image or has
+    more than PROFILE_PIC_MAX_PIXELS pixels.
+    """
+    try:
+        with Image.open(upload.temporary_path) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        upload.discard()
+        raise ValueError(f"Invalid image: {str(e)}")
+    if width * height > settings.PROFILE_PIC_MAX_PIXELS:
+        upload.discard()
+        raise ValueError(f"Image too large: {width}x{height} pixels")
+    extension = FORMAT_EXTENSIONS.get(image_format)
+    if extension is None:
+        upload.discard()
+        raise ValueError(f"Unsupported image format: {image_format}")
+
+    name = f"{PROFILE_PIC_DIR}/{upload.sha256[:2]}/{upload.sha256}.{extension}"
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    upload.close()
+    if os.path.exists(path):
+        logger.debug(f"Profile picture {name} already stored; reusing it")
+        os.remove(upload.temporary_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(upload.temporary_path, path)
+        os.chmod(path, 0o644)
+    return name
+
+
+def release_profile_picture(name):
+    """
+    Deletes a profile's previous picture unless another profile still uses
+    it: content-addressed files are shared by identical uploads.
+    """
+    if name and not UserProfile.objects.filter(profile_pic=name).exists():
+        UserProfile._meta.get_field('profile_pic').storage.delete(name)
+
+
+def thumbnail_name(name, size):
+    match = CONTENT_ADDRESSED_NAME.match(name or '')
+    if match is None:
+        return None
+    return f"{PROFILE_PIC_DIR}/thumbs/{match['digest']}_{size}.png"
+
+
+def make_thumbnails(name):
+    """
+    Writes every missing ``PROFILE_PIC_THUMBNAIL_SIZES`` square variant of a
+    stored profile picture.
+    """
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGBA')
+        for size in settings.PROFILE_PIC_THUMBNAIL_SIZES:
+            target = os.path.join(settings.MEDIA_ROOT, thumbnail_name(name, size))
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            # Write then rename so readers never see a half-written thumbnail
+            partial = f"{target}.{threading.get_ident()}.part"
+            thumbnail.save(partial, 'PNG', optimize=True)
+            os.replace(partial, target)
+    logger.debug(f"Thumbnails ready for {name}")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+                )
+    return _executor
+
+
+def schedule_thumbnails(name):
+    def run():
+        try:
+            make_thumbnails(name)
+        except Exception as e:
+            logger.error(f"Thumbnail generation failed for {name}: {str(e)}")
+
+    return thumbnail_executor().submit(run)
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import UserProfileViewSet, TeamViewSet, CardViewSet, WorkDayViewSet
+from .profiling import prometheus_metrics
+from .realtime import team_events
 
 # Initialize the router
 router = DefaultRouter()
@@ -12,6 +14,8 @@ router.register(r'workdays', WorkDayViewSet, basename='workday')  # Added WorkDa
 
 urlpatterns = [
     path('teams/join/', TeamViewSet.as_view({'post': 'join'}), name='team-join'),
-    path('teams/<int:pk>/members/<str:username>/', TeamViewSet.as_view({'delete': 'remove_member'}), name='team-remove-member'),
+    path('teams/<int:pk>/members/<int:member_id>/', TeamViewSet.as_view({'delete': 'remove_member'}), name='team-remove-member'),
+    path('teams/<int:pk>/events/', team_events, name='team-events'),
+    path('_metrics/', prometheus_metrics, name='metrics'),
     path('', include(router.urls)),  # Router URLs come last to avoid conflicts
 ]
\ No newline at end of file
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Every team has a version number in the cache. Anything derived from a team
+# (its roster, for now) is cached under the current version, so bumping the
+# version retires all of it at once without having to know the keys.
+#
+# Card writes bump a separate "board" version instead, so that moving a card
+# retires what is derived from the cards (facets) without reloading rosters.
+#
+# New versions start from the clock rather than 1: if a version key is evicted
+# while entries cached under it survive, the fresh version cannot collide with
+# them.
+#
+# Versions only retire entries everywhere when every worker shares the cache;
+# what must never be stale (board snapshots) is not cached otherwise, and the
+# rest is kept for PROCESS_CACHE_TIMEOUT seconds at most (cache_timeout).
+
+
+TEAM = 'version'
+BOARD = 'board'
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """
+    Whether every worker sees the same cache: CACHE_SHARED when set,
+    otherwise guessed from the backend.
+    """
+    if settings.CACHE_SHARED is not None:
+        return settings.CACHE_SHARED
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def cache_timeout(timeout):
+    """
+    ``timeout`` for an entry that writes retire (one cached under team
+    versions, or a membership set), capped at PROCESS_CACHE_TIMEOUT when a
+    write in another worker cannot retire it.
+    """
+    if cache_is_shared():
+        return timeout
+    return min(timeout, settings.PROCESS_CACHE_TIMEOUT)
+
+
+def _version_key(team_id, kind=TEAM):
+    return f"team:{kind}:{team_id}"
+
+
+def team_versions(team_ids, kind=TEAM):
+    """
+    Maps each team id to its current version, creating missing versions.
+    """
+    keys = {_version_key(team_id, kind): team_id for team_id in team_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for key, team_id in keys.items():
+        if team_id not in versions:
+            # add() keeps whichever process created the version first
+            cache.add(key, time.time_ns(), None)
+            versions[team_id] = cache.get(key, time.time_ns())
+    return versions
+
+
+def team_version(team_id, kind=TEAM):
+    return team_versions([team_id], kind)[team_id]
+
+
+def bump_team_versions(team_ids, kind=TEAM):
+    for team_id in team_ids:
+        key = _version_key(team_id, kind)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
@@ -1,64 +1,76 @@
-from rest_framework import viewsets, status, serializers
+from rest_framework import generics, viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser
 from django.utils import timezone
-from .models import UserProfile, Team, Card, TeamMember, WorkDay
-from .serializers import UserProfileSerializer, TeamSerializer, CardSerializer, TeamMemberSerializer, WorkDaySerializer
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from datetime import timedelta
+from .models import UserProfile, Team, Card, CardTombstone, TeamMember, WorkDay, WorkRollup, TeamWorkRollup
+from .serializers import ProfileReadSerializer, UserProfileSerializer, TeamSerializer, CardSerializer, CardBulkChangeSerializer, TeamMemberSerializer, WorkDaySerializer
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.mixins import ListModelMixin, UpdateModelMixin, RetrieveModelMixin, CreateModelMixin, DestroyModelMixin
 from rest_framework.viewsets import GenericViewSet
-from django.contrib.auth.models import User
-from firebase_admin import auth
-import jwt
 from rest_framework.exceptions import AuthenticationFailed
+from .firebase_auth import authenticate_token
+from .presence import presence_store
+from .uploads import StreamingImageUploadHandler, release_profile_picture, schedule_thumbnails, store_profile_picture
+from .pagination import KeysetPagination, after_cursor, decode_cursor, encode_cursor
+from .signals import cards_bulk_updated
+from . import membership
+from .roster import roster, roster_validator, rosters
+from .versioning import cache_is_shared, team_versions
+from .db_routing import ReplicaReadMixin
+from .conditional import make_etag, not_modified, set_validators
+from . import realtime
+from . import board_cache, boards, burndown, facets, projections, search, timesheets, worktime
 import logging
 
 logger = logging.getLogger(__name__)
 
+def parse_date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise serializers.ValidationError({name: "Date must be in YYYY-MM-DD format"})
+    return parsed
+
 class FirebaseAuthentication(IsAuthenticated):
     def has_permission(self, request, view):
         auth_header = request.META.get('HTTP_AUTHORIZATION')
         if not auth_header:
             raise AuthenticationFailed('No authorization header')
+        # The authentication class has already run the token pipeline for this request
+        if request.user and request.user.is_authenticated:
+            return True
         try:
             token = auth_header.split(' ')[1]
-            decoded_token = auth.verify_id_token(token)
-            firebase_uid = decoded_token['uid']
-            logger.debug(f"Token decoded successfully: {decoded_token}")
-            try:
-                user, created = User.objects.get_or_create(
-                    username=firebase_uid,
-                    defaults={
-                        'email': decoded_token.get('email', ''),
-                        'first_name': decoded_token.get('name', '')
-                    }
-                )
-                if not created and (user.email != decoded_token.get('email') or user.first_name != decoded_token.get('name')):
-                    user.email = decoded_token.get('email', user.email)
-                    user.first_name = decoded_token.get('name', user.first_name)
-                    user.save()
-                logger.debug(f"{'Created new' if created else 'Found existing'} user with uid: {firebase_uid}")
-            except Exception as e:
-                logger.error(f"Error syncing user: {str(e)}")
-                raise AuthenticationFailed(f'Error syncing user: {str(e)}')
-            request.user = user
+            request.user = authenticate_token(token)
             return True
-        except (jwt.InvalidTokenError, auth.InvalidIdTokenError):
-            logger.error("Invalid token provided")
-            raise AuthenticationFailed('Invalid token')
+        except AuthenticationFailed:
+            raise
         except Exception as e:
             logger.error(f"Authentication error: {str(e)}")
             raise AuthenticationFailed(f'Authentication error: {str(e)}')
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [FirebaseAuthentication]
 
     def get_queryset(self):
         return UserProfile.objects.filter(user=self.request.user, is_active=True)
 
-    def get_object(self):
+    def get_profile(self):
         try:
             profile = UserProfile.objects.get(user=self.request.user)
             logger.debug(f"Found existing profile for user: {self.request.user.username}")
@@ -73,8 +85,12 @@ class UserProfileViewSet(viewsets.ModelViewSet):
                 is_active=True
             )
             logger.debug(f"Created new profile: {profile.__dict__}")
-        profile.last_login = timezone.now()
-        profile.save()
+        return profile
+
+    def get_object(self):
+        # Presence is recorded in memory and flushed to last_login in the background
+        profile = self.get_profile()
+        profile.last_login = presence_store.touch(profile.id)
         return profile
 
     def perform_update(self, serializer):
@@ -84,8 +100,16 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        etag = make_etag('profile', instance.id, instance.updated_at, instance.profile_pic.name, request.user.email)
+        response = not_modified(request, etag, instance.updated_at)
+        if response is None:
+            serializer = ProfileReadSerializer(instance, context=self.get_serializer_context())
+            response = set_validators(Response(serializer.data), etag, instance.updated_at)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        # There is only ever the caller's own profile to retrieve
+        return self.list(request, *args, **kwargs)
 
     def update(self, request, *args, **kwargs):
         logger.debug(f"Received update request with data: {request.data}")
@@ -133,11 +157,59 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=['post'], url_path='picture', parser_classes=[MultiPartParser])
+    def upload_picture(self, request):
+        """
+        Multipart upload of the profile picture (field ``profile_pic``).
+        The file is streamed to disk, stored under its content hash and
+        thumbnailed in the background.
+        """
+        handler = StreamingImageUploadHandler(request._request)
+        # Must be set on the Django request before the body is parsed
+        request._request.upload_handlers = [handler]
+        try:
+            return self._store_picture(request, handler)
+        finally:
+            handler.cleanup()
+
+    def _store_picture(self, request, handler):
+        upload = request.FILES.get('profile_pic')
+        if handler.too_large:
+            return Response(
+                {"profile_pic": "Profile picture size should not exceed 5MB"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        if upload is None:
+            return Response({"profile_pic": "No file was submitted"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            name = store_profile_picture(upload)
+        except ValueError as e:
+            logger.error(f"Rejected profile picture from {request.user.username}: {str(e)}")
+            return Response({"profile_pic": "Invalid image format"}, status=status.HTTP_400_BAD_REQUEST)
+
+        profile = self.get_object()
+        previous = profile.profile_pic.name if profile.profile_pic else None
+        profile.profile_pic.name = name
+        profile.save(update_fields=['profile_pic', 'updated_at'])
+        if previous != name:
+            release_profile_picture(previous)
+        schedule_thumbnails(name)
+        logger.debug(f"Stored profile picture {name} for user {request.user.username}")
+        return Response(self.get_serializer(profile).data)
+
+    @action(detail=False, methods=['post'])
+    def heartbeat(self, request):
+        profile = self.get_profile()
+        last_seen = presence_store.touch(profile.id)
+        return Response({"last_seen": last_seen})
+
     @action(detail=False, methods=['get'])
     def session_duration(self, request):
-        profile = self.get_object()
-        if profile.last_login:
-            duration = timezone.now() - profile.last_login
+        profile = self.get_profile()
+        last_seen = presence_store.last_seen(profile.id) or profile.last_login
+        presence_store.touch(profile.id)
+        if last_seen:
+            duration = timezone.now() - last_seen
             seconds = int(duration.total_seconds())
             logger.debug(f"Session duration for user {request.user.username}: {seconds} seconds")
             return Response({
@@ -147,18 +219,34 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         logger.debug(f"No session duration available for user {request.user.username}")
         return Response({"duration_seconds": 0, "formatted_duration": "00:00:00"})
 
-class TeamViewSet(ListModelMixin, CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
+class TeamViewSet(ReplicaReadMixin, ListModelMixin, CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
     serializer_class = TeamSerializer
     permission_classes = [FirebaseAuthentication]
 
     def get_queryset(self):
-        queryset = Team.objects.filter(teammember__user_profile__user=self.request.user)
-        try:
-            queryset = queryset.prefetch_related('teammember__user_profile')
-        except AttributeError as e:
-            logger.error(f"Prefetch error: {str(e)}. Ensure TeamMember model is correctly configured.")
-            queryset = Team.objects.filter(teammember__user_profile__user=self.request.user)
-        return queryset
+        # Members come from the cached roster (api/roster.py), not a prefetch
+        return Team.objects.filter(id__in=membership.team_ids_for_user(self.request.user))
+
+    def list(self, request, *args, **kwargs):
+        # Teams are never edited in place, so the team ids and their roster
+        # versions fully describe the list; a 304 needs no query at all.
+        # Versions and rosters in a per-process cache can miss changes made
+        # through other workers, so the list is then always sent in full
+        team_ids = sorted(membership.team_ids_for_user(request.user))
+        etag = make_etag('teams', team_ids, sorted(team_versions(team_ids).items())) if cache_is_shared() else None
+        response = not_modified(request, etag) if etag else None
+        if response is not None:
+            return response
+        teams = list(projections.team_values(self.filter_queryset(self.get_queryset())))
+        data = projections.team_rows(teams, rosters([team['id'] for team in teams]))
+        return set_validators(Response(data), etag) if etag else Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        # GenericAPIView.get_object (404 on ids that are not numbers too) on the projected rows
+        queryset = projections.team_values(self.filter_queryset(self.get_queryset()))
+        team = generics.get_object_or_404(queryset, pk=kwargs[self.lookup_url_kwarg or self.lookup_field])
+        self.check_object_permissions(request, team)
+        return Response(projections.team_rows([team], rosters([team['id']]))[0])
 
     def perform_create(self, serializer):
         profile = UserProfile.objects.get(user=self.request.user)
@@ -187,8 +275,10 @@ class TeamViewSet(ListModelMixin, CreateModelMixin, RetrieveModelMixin, DestroyM
             logger.error(f"User {self.request.user.username} is not a Project Manager")
             raise serializers.ValidationError({"detail": "Only Project Managers can delete teams"})
         logger.debug(f"Deleting team ID: {instance.id}, name: {instance.name}")
+        team_id = instance.id
         instance.delete()
-        logger.debug(f"Team {instance.id} deleted successfully")
+        realtime.publish(team_id, 'team.deleted', {'id': team_id})
+        logger.debug(f"Team {team_id} deleted successfully")
 
     @action(detail=False, methods=['post'])
     def join(self, request):
@@ -216,6 +306,9 @@ class TeamViewSet(ListModelMixin, CreateModelMixin, RetrieveModelMixin, DestroyM
                     status=status.HTTP_400_BAD_REQUEST
                 )
             serializer = self.get_serializer(team)
+            realtime.publish(team.id, 'member.joined', {
+                'id': profile.id, 'name': profile.name, 'firebase_uid': request.user.username
+            })
             logger.debug(f"User {self.request.user.username} joined team {team.name}")
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Team.DoesNotExist:
@@ -243,6 +336,7 @@ class TeamViewSet(ListModelMixin, CreateModelMixin, RetrieveModelMixin, DestroyM
                     status=status.HTTP_400_BAD_REQUEST
                 )
             team_member.delete()
+            realtime.publish(team.id, 'member.left', {'id': int(member_id)})
             logger.debug(f"Removed user with ID {member_id} from team ID: {pk}")
             serializer = self.get_serializer(team)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -259,16 +353,175 @@ class TeamViewSet(ListModelMixin, CreateModelMixin, RetrieveModelMixin, DestroyM
                 status=status.HTTP_404_NOT_FOUND
             )
 
-class TeamMemberViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], url_path='events/ticket')
+    def events_ticket(self, request, pk=None):
+        """
+        Single-use ticket for opening the team's event stream as
+        ``/api/teams/<id>/events/?ticket=...`` (EventSource sends no headers).
+        """
+        self.check_team_membership(pk)
+        return Response({"ticket": realtime.issue_ticket(request.user, pk), "expires_in": settings.REALTIME_TICKET_TTL})
+
+    def check_team_membership(self, pk):
+        if not membership.is_member(self.request.user, pk):
+            logger.warning(f"User {self.request.user.username} is not a member of team {pk}")
+            self.permission_denied(self.request, message="You are not a member of this team")
+
+    @action(detail=True, methods=['get'])
+    def burndown(self, request, pk=None):
+        """
+        Daily burndown of the team's board from stored snapshots.
+        ``from``/``to`` (YYYY-MM-DD) default to the team's sprint window.
+        """
+        self.check_team_membership(pk)
+        start = parse_date_param(request, 'from')
+        end = parse_date_param(request, 'to')
+        if start is None or end is None:
+            default_start, default_end = burndown.default_window(pk)
+            start, end = start or default_start, end or default_end
+        if start > end:
+            return Response({"detail": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > settings.BURNDOWN_MAX_DAYS:
+            return Response(
+                {"detail": f"The window cannot exceed {settings.BURNDOWN_MAX_DAYS} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            "team": int(pk),
+            "from": start,
+            "to": end,
+            "days": burndown.burndown_series(pk, start, end),
+        })
+
+    @action(detail=True, methods=['get'])
+    def facets(self, request, pk=None):
+        """
+        Card counts by column, priority and assignee, plus overdue counts, for
+        board headers and dashboard widgets.
+        """
+        self.check_team_membership(pk)
+        return Response(facets.board_facets(pk))
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        Cards whose [start_date, deadline] interval overlaps the ``from``/``to`` window,
+        projected to the fields the Gantt and Roadmap charts draw.
+        A card with only one of the two dates is treated as a single day.
+        """
+        self.check_team_membership(pk)
+        start = parse_date_param(request, 'from')
+        end = parse_date_param(request, 'to')
+        if start is None or end is None:
+            return Response({"detail": "'from' and 'to' are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"detail": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        cards = (
+            Card.objects.filter(team_id=pk)
+            .filter(Q(start_date__lte=end) | Q(start_date__isnull=True, deadline__lte=end))
+            .filter(Q(deadline__gte=start) | Q(deadline__isnull=True, start_date__gte=start))
+            .order_by(Coalesce('start_date', 'deadline'), 'id')
+            .values(
+                'id', 'title', 'column', 'priority', 'progress', 'start_date', 'deadline',
+                'assigned_to', assigned_to_name=F('assigned_to__name')
+            )
+        )
+        return Response({
+            "team": int(pk),
+            "from": start,
+            "to": end,
+            "cards": list(cards),
+        })
+
+    @action(detail=True, methods=['get'])
+    def timesheet(self, request, pk=None):
+        """
+        Streams the team's work days that started between ``from`` and ``to``
+        (YYYY-MM-DD) as CSV or, with ``output=ndjson``, one JSON object per line.
+        ``member`` (repeatable profile id) narrows the export; Team Members can
+        only export their own rows.
+        """
+        self.check_team_membership(pk)
+        start = parse_date_param(request, 'from')
+        end = parse_date_param(request, 'to')
+        if start is None or end is None:
+            return Response({"detail": "'from' and 'to' are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"detail": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        output = request.query_params.get('output', 'csv')
+        if output not in timesheets.FORMATS:
+            return Response({"output": "Output must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            member_ids = {int(member_id) for member_id in request.query_params.getlist('member')}
+        except ValueError:
+            return Response({"member": "Member must be a profile id"}, status=status.HTTP_400_BAD_REQUEST)
+        profile = UserProfile.objects.get(user=request.user)
+        if profile.role != 'Project Manager':
+            if member_ids - {profile.id}:
+                return Response(
+                    {"detail": "Only Project Managers can export other members' timesheets"},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            member_ids = {profile.id}
+
+        content_type, extension, chunks = timesheets.stream_timesheet(output, pk, start, end, member_ids)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="timesheet-team{pk}-{start}-{end}.{extension}"'
+        logger.debug(f"Streaming {output} timesheet of team {pk} from {start} to {end} for {request.user.username}")
+        return response
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Streams the team's board as NDJSON (see api/boards.py); ``workdays=1``
+        includes the members' work days. Project Managers only.
+        """
+        self.check_team_membership(pk)
+        profile = UserProfile.objects.get(user=request.user)
+        if profile.role != 'Project Manager':
+            return Response({"detail": "Only Project Managers can export boards"}, status=status.HTTP_403_FORBIDDEN)
+        team = get_object_or_404(Team, pk=pk)
+        include_workdays = request.query_params.get('workdays') in ('1', 'true')
+        response = StreamingHttpResponse(boards.export_board(team, include_workdays), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="board-{team.code}.ndjson"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_board(self, request):
+        """
+        Creates a team from an NDJSON board export sent as the request body.
+        ``code`` replaces the exported team code. The caller joins the new team;
+        members must already be in one of the caller's teams, and work days
+        are only imported by the import_board command.
+        """
+        profile = UserProfile.objects.get(user=request.user)
+        if profile.role != 'Project Manager':
+            return Response({"detail": "Only Project Managers can import boards"}, status=status.HTTP_403_FORBIDDEN)
+        if request.stream is None:
+            return Response({"detail": "The request body must be an NDJSON board export"}, status=status.HTTP_400_BAD_REQUEST)
+        importer = boards.BoardImporter(
+            code=request.query_params.get('code'),
+            manager=profile,
+            progress=lambda kind, count: logger.debug(f"Board import by {request.user.username}: {count} {kind}"),
+        )
+        try:
+            result = importer.run(request.stream)
+        except boards.BoardImportError as e:
+            logger.error(f"Board import by {request.user.username} failed: {str(e)}")
+            return Response({"detail": str(e), "imported": importer.counts}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+class TeamMemberViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = TeamMemberSerializer
     permission_classes = [FirebaseAuthentication]
 
     def get_queryset(self):
         return TeamMember.objects.filter(user_profile__user=self.request.user)
 
-class CardViewSet(viewsets.ModelViewSet):
+class CardViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = CardSerializer
     permission_classes = [FirebaseAuthentication]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         team_id = self.request.query_params.get('team_id')
@@ -277,60 +530,93 @@ class CardViewSet(viewsets.ModelViewSet):
             logger.warning("No team_id provided, returning empty queryset")
             return Card.objects.none()
         
-        try:
-            team = Team.objects.get(id=team_id)
-            profile = UserProfile.objects.get(user=self.request.user)
-            if not TeamMember.objects.filter(team=team, user_profile=profile).exists():
-                logger.warning(f"User {self.request.user.username} is not a member of team {team_id}")
-                return Card.objects.none()
-            cards = Card.objects.filter(team=team)
-            logger.debug(f"Returning {cards.count()} cards for team {team_id}")
-            return cards
-        except Team.DoesNotExist:
-            logger.error(f"Team {team_id} does not exist")
+        if not membership.is_member(self.request.user, team_id):
+            logger.warning(f"User {self.request.user.username} is not a member of team {team_id}")
             return Card.objects.none()
+        return Card.objects.filter(team_id=team_id).select_related('assigned_to', 'updated_by')
 
-    def get_object(self):
+    def _project(self):
+        # ListModelMixin.list on ``.values()`` rows (api/projections.py)
+        queryset = projections.card_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projections.card_rows(page))
+        return Response(projections.card_rows(queryset))
+
+    def list(self, request, *args, **kwargs):
+        team_id = request.query_params.get('team_id')
+        if not team_id or not membership.is_member(request.user, team_id):
+            return self._project()
+        team_id = int(team_id)
+        # The plain JSON list is served from the rendered snapshot (api/board_cache.py);
+        # pages and other formats only borrow its validators when it is cached
+        params = request.query_params
+        paginated = self.paginator.cursor_query_param in params or self.paginator.page_size_query_param in params
+        use_snapshot = not paginated and request.accepted_renderer.format == 'json'
+        snapshot = board_cache.board_snapshot(team_id) if use_snapshot else board_cache.cached_snapshot(team_id)
+        if snapshot is None:
+            snapshot = board_cache.board_state(team_id)
+        count, last = snapshot.count, snapshot.last
+        # The roster validator covers renamed assignees shown in the payload
+        etag = make_etag('cards', team_id, count, last, roster_validator(team_id), request.get_full_path())
+        response = not_modified(request, etag, last)
+        if response is None:
+            if use_snapshot and snapshot.body is not None:
+                response = HttpResponse(snapshot.body, content_type='application/json')
+            else:
+                response = self._project()
+            response = set_validators(response, etag, last)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(projections.card_row(self.get_object(projections.card_values(Card.objects.all()))))
+
+    def get_object(self, queryset=None):
+        """
+        The card of the URL, from ``queryset`` when given (e.g. a ``.values()``
+        projection, which yields a dict).
+        """
         card_id = self.kwargs.get('pk')
         logger.debug(f"Retrieving card with ID: {card_id}, user: {self.request.user.username}")
         if not card_id or not card_id.isdigit():
             logger.error(f"Invalid card ID: {card_id}")
             raise serializers.ValidationError({"detail": "Invalid card ID"})
+        if queryset is None:
+            queryset = Card.objects.select_related('assigned_to', 'updated_by')
         try:
-            card = get_object_or_404(Card, pk=card_id)
-            profile = UserProfile.objects.get(user=self.request.user)
-            if not TeamMember.objects.filter(team=card.team, user_profile=profile).exists():
-                logger.warning(f"User {self.request.user.username} is not a member of team {card.team.id}")
+            card = get_object_or_404(queryset, pk=card_id)
+            team_id = card['team_id'] if isinstance(card, dict) else card.team_id
+            if not membership.is_member(self.request.user, team_id):
+                logger.warning(f"User {self.request.user.username} is not a member of team {team_id}")
                 self.permission_denied(self.request, message="You are not a member of this team")
-            logger.debug(f"Returning card: {card.title} (ID: {card_id})")
+            logger.debug(f"Returning card ID: {card_id}")
             return card
         except Card.DoesNotExist:
             logger.error(f"Card with ID {card_id} does not exist")
             raise serializers.ValidationError({"detail": "No Card matches the given query."})
 
     def perform_create(self, serializer):
-        team_id = self.request.data.get('team')
-        logger.debug(f"Creating card for team_id: {team_id}, user: {self.request.user.username}")
-        try:
-            team = Team.objects.get(id=team_id)
-            profile = UserProfile.objects.get(user=self.request.user)
-            if not TeamMember.objects.filter(team=team, user_profile=profile).exists():
-                logger.error(f"User {self.request.user.username} is not a member of team {team_id}")
-                raise serializers.ValidationError({"detail": "You are not a member of this team"})
-            serializer.save(updated_by=profile)
-            logger.debug(f"Card created successfully for team {team_id}")
-        except Team.DoesNotExist:
-            logger.error(f"Team {team_id} does not exist")
+        team = serializer.validated_data.get('team')
+        logger.debug(f"Creating card for team: {team}, user: {self.request.user.username}")
+        if team is None:
             raise serializers.ValidationError({"team": "Invalid team ID"})
+        if not membership.is_member(self.request.user, team.id):
+            logger.error(f"User {self.request.user.username} is not a member of team {team.id}")
+            raise serializers.ValidationError({"detail": "You are not a member of this team"})
+        profile = UserProfile.objects.get(user=self.request.user)
+        serializer.save(updated_by=profile)
+        realtime.publish(team.id, 'card.created', serializer.data)
+        logger.debug(f"Card created successfully for team {team.id}")
 
     def perform_update(self, serializer):
-        card = self.get_object()
+        # get_object() already ran (and checked membership) in update()
+        card = serializer.instance
         logger.debug(f"Updating card ID: {card.id}, user: {self.request.user.username}, data: {self.request.data}")
         profile = UserProfile.objects.get(user=self.request.user)
         
         # Check authorization for progress updates
         if 'progress' in self.request.data:
-            if profile.role != 'Project Manager' and card.assigned_to != profile:
+            if profile.role != 'Project Manager' and card.assigned_to_id != profile.id:
                 logger.error(f"User {self.request.user.username} is not authorized to update progress for card {card.id}")
                 raise serializers.ValidationError({"detail": "Only the assigned team member or Project Manager can update progress"})
         
@@ -341,14 +627,195 @@ class CardViewSet(viewsets.ModelViewSet):
                 raise serializers.ValidationError({"detail": "Only Project Managers can update sprint dates"})
         
         serializer.save(updated_by=profile)
+        realtime.publish(card.team_id, 'card.updated', serializer.data)
         logger.debug(f"Card {card.id} updated successfully")
 
     def perform_destroy(self, instance):
         logger.debug(f"Deleting card ID: {instance.id}, user: {self.request.user.username}")
-        instance.delete()
-        logger.debug(f"Card {instance.id} deleted successfully")
+        card_id, team_id = instance.id, instance.team_id
+        with transaction.atomic():
+            instance.delete()
+            # Leave a tombstone so delta-sync clients can drop the card locally
+            CardTombstone.objects.create(team_id=team_id, card_id=card_id)
+            CardTombstone.objects.filter(team_id=team_id, deleted_at__lt=self.tombstone_horizon()).delete()
+            realtime.publish(team_id, 'card.deleted', {'id': card_id, 'team': team_id})
+        logger.debug(f"Card {card_id} deleted successfully")
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Applies many card changes (e.g. a drag-and-drop reshuffle) in one transaction.
+        Body: ``{"changes": [{"id": ..., "column": ..., "progress": ..., ...}, ...]}``.
+        Every item gets its own result; invalid items are skipped, the rest are saved.
+        """
+        changes = request.data.get('changes') if isinstance(request.data, dict) else request.data
+        if not isinstance(changes, list) or not changes:
+            return Response({"detail": "A non-empty list of changes is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(changes) > settings.CARD_BULK_MAX_CHANGES:
+            return Response(
+                {"detail": f"At most {settings.CARD_BULK_MAX_CHANGES} changes can be applied at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        profile = UserProfile.objects.get(user=request.user)
+        is_manager = profile.role == 'Project Manager'
+
+        results = [None] * len(changes)
+        validated = {}
+        for index, change in enumerate(changes):
+            serializer = CardBulkChangeSerializer(data=change)
+            if serializer.is_valid():
+                validated[index] = serializer.validated_data
+            else:
+                card_id = change.get('id') if isinstance(change, dict) else None
+                results[index] = {"id": card_id, "status": "error", "errors": serializer.errors}
+
+        with transaction.atomic():
+            cards = Card.objects.select_for_update().in_bulk({data['id'] for data in validated.values()})
+            assignee_ids = {data['assigned_to'] for data in validated.values() if data.get('assigned_to')}
+            # The caller's and every assignee's teams come from the membership
+            # cache; misses are filled with a single TeamMember query
+            memberships = {
+                (team_id, profile_id)
+                for profile_id, team_ids in membership.team_ids_for_profiles(assignee_ids | {profile.id}).items()
+                for team_id in team_ids
+            }
+
+            updated = {}
+            previous = {}
+            fields = set()
+            now = timezone.now()
+            for index, data in validated.items():
+                card = cards.get(data['id'])
+                error = None
+                if card is None:
+                    error = {"detail": "No Card matches the given query."}
+                elif (card.team_id, profile.id) not in memberships:
+                    error = {"detail": "You are not a member of this team"}
+                elif 'progress' in data and not is_manager and card.assigned_to_id != profile.id:
+                    error = {"detail": "Only the assigned team member or Project Manager can update progress"}
+                elif ('sprint_start' in data or 'sprint_finish' in data) and not is_manager:
+                    error = {"detail": "Only Project Managers can update sprint dates"}
+                elif data.get('assigned_to') and (card.team_id, data['assigned_to']) not in memberships:
+                    error = {"assigned_to": "Assigned user must be a team member"}
+                if error:
+                    results[index] = {"id": data['id'], "status": "error", "errors": error}
+                    continue
+                previous.setdefault(card.id, (card.team_id, card.column, card.progress))
+                for field, value in data.items():
+                    if field == 'id':
+                        continue
+                    attname = 'assigned_to_id' if field == 'assigned_to' else field
+                    setattr(card, attname, value)
+                    fields.add(field)
+                card.updated_by = profile
+                card.updated_at = now
+                updated[card.id] = card
+                results[index] = {"id": card.id, "status": "updated"}
+
+            if updated:
+                Card.objects.bulk_update(
+                    list(updated.values()),
+                    sorted(fields | {'updated_by', 'updated_at'}),
+                    batch_size=200
+                )
+                cards_bulk_updated.send(sender=Card, cards=list(updated.values()), previous=previous)
+
+        fresh = Card.objects.filter(id__in=updated).select_related('assigned_to', 'updated_by').in_bulk()
+        by_team = {}
+        for index, result in enumerate(results):
+            if result['status'] != 'updated':
+                continue
+            card = fresh.get(result['id'])
+            if card is None:
+                # Deleted by another request since the update committed
+                results[index] = {"id": result['id'], "status": "error", "errors": {"detail": "No Card matches the given query."}}
+                continue
+            result['card'] = self.get_serializer(card).data
+            by_team.setdefault(card.team_id, []).append(result['card'])
+        for team_id, team_cards in by_team.items():
+            realtime.publish(team_id, 'cards.updated', team_cards)
+        logger.debug(f"Bulk update by {request.user.username}: {len(updated)} of {len(changes)} changes applied")
+        return Response({"results": results})
+
+    @staticmethod
+    def tombstone_horizon():
+        return timezone.now() - timedelta(days=settings.CARD_TOMBSTONE_RETENTION_DAYS)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Cards changed and deleted in a team since ``since`` (a cursor from a previous call).
+        Without ``since``, or once the cursor is older than the tombstone retention window,
+        the whole board is returned with ``full_resync`` set.
+        """
+        team_id = request.query_params.get('team_id')
+        if not team_id or not team_id.isdigit():
+            return Response({"detail": "team_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not membership.is_member(request.user, team_id):
+            logger.warning(f"User {request.user.username} is not a member of team {team_id}")
+            return Response({"detail": "You are not a member of this team"}, status=status.HTTP_403_FORBIDDEN)
 
-class WorkDayViewSet(viewsets.ModelViewSet):
+        cards = Card.objects.filter(team_id=team_id).select_related('assigned_to', 'updated_by')
+        since = request.query_params.get('since')
+        position = decode_cursor(since) if since else None
+        full_resync = position is None or position[0] < self.tombstone_horizon()
+        deleted = []
+        if full_resync:
+            cards = cards.order_by('updated_at', 'id')
+        else:
+            cards = after_cursor(cards, position).order_by('updated_at', 'id')
+            deleted = list(
+                CardTombstone.objects.filter(team_id=team_id, deleted_at__gt=position[0])
+                .order_by('deleted_at')
+                .values_list('card_id', 'deleted_at')
+            )
+
+        cards = list(cards)
+        # The next cursor is the newest change seen, whether an update or a delete
+        candidates = [position] if position else []
+        if cards:
+            candidates.append((cards[-1].updated_at, cards[-1].id))
+        if deleted:
+            candidates.append((deleted[-1][1], 0))
+        cursor = encode_cursor(*max(candidates)) if candidates else since
+        logger.debug(f"Delta sync for team {team_id}: {len(cards)} changed, {len(deleted)} deleted")
+        return Response({
+            "cards": self.get_serializer(cards, many=True).data,
+            "deleted": [card_id for card_id, _ in deleted],
+            "cursor": cursor,
+            "full_resync": full_resync,
+        })
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked card title search for typeahead: ``q`` (the last word also
+        matches as a prefix), ``team_id`` (default: all of the user's teams)
+        and ``limit``.
+        """
+        team_id = request.query_params.get('team_id')
+        if team_id:
+            if not team_id.isdigit():
+                return Response({"detail": "Invalid team_id"}, status=status.HTTP_400_BAD_REQUEST)
+            if not membership.is_member(request.user, team_id):
+                logger.warning(f"User {request.user.username} is not a member of team {team_id}")
+                return Response({"detail": "You are not a member of this team"}, status=status.HTTP_403_FORBIDDEN)
+            team_ids = [int(team_id)]
+        else:
+            team_ids = membership.team_ids_for_user(request.user)
+        try:
+            limit = int(request.query_params.get('limit', settings.CARD_SEARCH_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"limit": "Limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.CARD_SEARCH_MAX_LIMIT))
+
+        card_ids = search.search_cards(team_ids, search.parse_query(request.query_params.get('q', '')), limit)
+        cards = Card.objects.select_related('assigned_to', 'updated_by').in_bulk(card_ids)
+        # Skips a card deleted between the two queries
+        ranked = [cards[card_id] for card_id in card_ids if card_id in cards]
+        return Response({"results": self.get_serializer(ranked, many=True).data})
+
+class WorkDayViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = WorkDaySerializer
     permission_classes = [FirebaseAuthentication]
 
@@ -357,14 +824,83 @@ class WorkDayViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         profile = UserProfile.objects.get(user=self.request.user)
-        logger.debug(f"Checking active workdays for user: {self.request.user.username}, profile_id: {profile.id}")
-        active_workdays = WorkDay.objects.filter(user_profile=profile, end_time__isnull=True)
-        logger.debug(f"Active workdays found: {active_workdays.count()}, QuerySet: {active_workdays}")
-        if active_workdays.exists():
+        # The one_open_workday_per_user unique expression rejects a second open
+        # work day. Databases without expression indexes (MySQL before 8.0.13)
+        # skip it, so there the profile row is locked and checked instead.
+        try:
+            with transaction.atomic():
+                if not connection.features.supports_expression_indexes:
+                    UserProfile.objects.select_for_update().filter(id=profile.id).first()
+                    if WorkDay.objects.filter(user_profile=profile, end_time__isnull=True).exists():
+                        raise IntegrityError("one_open_workday_per_user")
+                serializer.save(user_profile=profile, start_time=timezone.now())
+        except IntegrityError:
             logger.warning(f"Active workday exists for user: {self.request.user.username}")
             raise serializers.ValidationError({"detail": "A work day is already active"})
-        logger.debug(f"No active workdays. Creating new workday for user: {self.request.user.username}")
-        serializer.save(user_profile=profile, start_time=timezone.now())
+        logger.debug(f"Created new workday for user: {self.request.user.username}")
+
+    def perform_update(self, serializer):
+        workday = serializer.instance
+        end_time = serializer.validated_data.pop('end_time', workday.end_time)
+        start_time = serializer.validated_data.get('start_time', workday.start_time)
+        if workday.end_time and start_time != workday.start_time:
+            raise serializers.ValidationError({"start_time": "The start of an ended work day cannot be changed"})
+        if workday.end_time and end_time is None:
+            raise serializers.ValidationError({"end_time": "An ended work day cannot be reopened"})
+        if end_time is not None and end_time < start_time:
+            raise serializers.ValidationError({"end_time": "End time must be after start time"})
+        if serializer.validated_data:
+            serializer.save()
+        # Ending a day (or moving its end) also updates the totals and rollups
+        if end_time != workday.end_time and not worktime.set_end_time(workday, end_time):
+            raise serializers.ValidationError({"detail": "The work day was changed by another request"})
+        logger.debug(f"Updated workday {workday.id} for user: {self.request.user.username}")
+
+    def perform_destroy(self, instance):
+        worktime.remove_workday(instance)
+
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        """
+        Pre-aggregated worked time per ``period`` (day or week) between
+        ``from`` and ``to`` (YYYY-MM-DD, default: the last 4 weeks).
+        With ``team_id`` the team's totals are returned, plus one row per
+        member and period.
+        """
+        period = request.query_params.get('period', 'day')
+        if period not in dict(WorkRollup.PERIOD_CHOICES):
+            return Response({"period": "Period must be 'day' or 'week'"}, status=status.HTTP_400_BAD_REQUEST)
+        end = parse_date_param(request, 'to') or timezone.localdate()
+        start = parse_date_param(request, 'from') or end - timedelta(days=27)
+        if start > end:
+            return Response({"detail": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        if period == 'week':
+            start -= timedelta(days=start.weekday())
+        fields = ('period_start', 'seconds', 'workdays')
+        window = {'period': period, 'period_start__range': (start, end)}
+
+        team_id = request.query_params.get('team_id')
+        if not team_id:
+            profile_id = membership.profile_id_for_user(request.user)
+            results = WorkRollup.objects.filter(user_profile_id=profile_id, **window).order_by('period_start')
+            return Response({
+                "period": period, "from": start, "to": end,
+                "results": list(results.values(*fields)),
+            })
+
+        if not membership.is_member(request.user, team_id):
+            logger.warning(f"User {request.user.username} is not a member of team {team_id}")
+            return Response({"detail": "You are not a member of this team"}, status=status.HTTP_403_FORBIDDEN)
+        results = TeamWorkRollup.objects.filter(team_id=team_id, **window).order_by('period_start')
+        member_ids = [profile_id for profile_id, _, _ in roster(team_id)]
+        members = WorkRollup.objects.filter(user_profile_id__in=member_ids, **window).order_by(
+            'user_profile_id', 'period_start'
+        )
+        return Response({
+            "period": period, "from": start, "to": end,
+            "results": list(results.values(*fields)),
+            "members": list(members.values('user_profile_id', *fields)),
+        })
 
     @action(detail=False, methods=['post'])
     def end(self, request):
@@ -376,15 +912,11 @@ class WorkDayViewSet(viewsets.ModelViewSet):
                     {"detail": "No active work day found"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            workday.end_time = timezone.now()
-            delta = workday.end_time - workday.start_time
-            hours, remainder = divmod(delta.seconds, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            workday.working_hours = f"{hours:02}:{minutes:02}:{seconds:02}"
-            workday.save()
-            # Update total_working_time in UserProfile
-            profile.total_working_time += delta.seconds
-            profile.save()
+            if not worktime.set_end_time(workday, timezone.now()):
+                return Response(
+                    {"detail": "No active work day found"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             serializer = WorkDaySerializer(workday)
             return Response(serializer.data)
         except UserProfile.DoesNotExist:
@@ -0,0 +1,177 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.utils import timezone
+
+from .models import TeamWorkRollup, UserProfile, WorkDay, WorkRollup
+from . import membership
+
+logger = logging.getLogger(__name__)
+
+
+def format_duration(seconds):
+    """
+    ``HH:MM:SS`` for the legacy working_hours column; hours may exceed 24.
+    """
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def duration_between(start, end):
+    # Whole seconds on both sides so the per-day pieces add up to the total
+    return max(0, int(end.timestamp()) - int(start.timestamp()))
+
+
+def split_by_day(start, end):
+    """
+    Splits ``[start, end]`` at local midnights into ``(date, seconds)`` pieces.
+    """
+    pieces = []
+    start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+    day = timezone.localtime(start).date()
+    while start_ts < end_ts:
+        next_midnight = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        piece_end = min(end_ts, int(next_midnight.timestamp()))
+        pieces.append((day, piece_end - start_ts))
+        start_ts = piece_end
+        day += timedelta(days=1)
+    return pieces or [(timezone.localtime(start).date(), 0)]
+
+
+def _write_deltas(model, owner, deltas):
+    """
+    Adds ``{(owner_id, period, period_start): [seconds, workdays]}`` to the
+    rollup rows of ``model`` with one CASE-based F() update for the rows that
+    exist and one bulk insert for the rest, so concurrent work days never lose
+    an update.
+    """
+    deltas = {key: value for key, value in deltas.items() if value != [0, 0]}
+    if not deltas:
+        return
+    owner_ids = {owner_id for owner_id, _, _ in deltas}
+    starts = {period_start for _, _, period_start in deltas}
+    existing = {
+        (owner_id, period, period_start): pk
+        for pk, owner_id, period, period_start in model.objects.filter(
+            **{f'{owner}_id__in': owner_ids}, period_start__in=starts
+        ).values_list('pk', f'{owner}_id', 'period', 'period_start')
+        if (owner_id, period, period_start) in deltas
+    }
+    if existing:
+        def increment(field, index):
+            return F(field) + Case(
+                *[When(pk=pk, then=Value(deltas[key][index])) for key, pk in existing.items()],
+                default=Value(0), output_field=BigIntegerField()
+            )
+        model.objects.filter(pk__in=existing.values()).update(
+            seconds=increment('seconds', 0), workdays=increment('workdays', 1)
+        )
+    missing = [key for key in deltas if key not in existing]
+    if not missing:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([
+                model(**{f'{owner}_id': owner_id}, period=period, period_start=period_start,
+                      seconds=deltas[key][0], workdays=deltas[key][1])
+                for key in missing
+                for owner_id, period, period_start in [key]
+            ])
+    except IntegrityError:
+        # Another request created some of the rows first; add to them one by one
+        for owner_id, period, period_start in missing:
+            lookup = {f'{owner}_id': owner_id, 'period': period, 'period_start': period_start}
+            seconds, workdays = deltas[(owner_id, period, period_start)]
+            if not model.objects.filter(**lookup).update(
+                seconds=F('seconds') + seconds, workdays=F('workdays') + workdays
+            ):
+                model.objects.create(seconds=seconds, workdays=workdays, **lookup)
+
+
+def _collect(deltas, profile_id, start, end, sign):
+    # Seconds are split over the days a work day spans; it counts as one work
+    # day on the day it started
+    for index, (day, seconds) in enumerate(split_by_day(start, end)):
+        for period, period_start in (('day', day), ('week', day - timedelta(days=day.weekday()))):
+            entry = deltas.setdefault((profile_id, period, period_start), [0, 0])
+            entry[0] += sign * seconds
+            entry[1] += sign if index == 0 else 0
+
+
+def _write(profile_id, user_deltas):
+    _write_deltas(WorkRollup, 'user_profile', user_deltas)
+    team_deltas = {}
+    for team_id in membership.team_ids_for_profile(profile_id):
+        for (_, period, period_start), (seconds, workdays) in user_deltas.items():
+            team_deltas[(team_id, period, period_start)] = [seconds, workdays]
+    _write_deltas(TeamWorkRollup, 'team', team_deltas)
+
+
+def apply_to_rollups(profile_id, start, end, sign=1):
+    """
+    Adds (``sign=1``) or removes (``sign=-1``) an ended work day from the
+    user's rollups and those of every team the user belongs to.
+    """
+    deltas = {}
+    _collect(deltas, profile_id, start, end, sign)
+    _write(profile_id, deltas)
+
+
+def add_workdays(workdays):
+    """
+    Adds ended work days created in bulk (e.g. by a board import) to their
+    users' total_working_time and rollups.
+    """
+    totals = {}
+    deltas = {}
+    for workday in workdays:
+        profile_id = workday.user_profile_id
+        totals[profile_id] = totals.get(profile_id, 0) + workday.duration_seconds
+        _collect(deltas.setdefault(profile_id, {}), profile_id, workday.start_time, workday.end_time, 1)
+    for profile_id, seconds in totals.items():
+        UserProfile.objects.filter(id=profile_id).update(total_working_time=F('total_working_time') + seconds)
+        _write(profile_id, deltas[profile_id])
+
+
+def set_end_time(workday, end_time):
+    """
+    Ends a work day, or moves the end of an ended one, and keeps the user's
+    total_working_time and the rollups in step. Returns ``False`` when the work
+    day changed underneath us (e.g. it was ended by a concurrent request).
+    """
+    duration = duration_between(workday.start_time, end_time)
+    with transaction.atomic():
+        # Conditional update: only the request that actually ends the day counts it
+        updated = WorkDay.objects.filter(id=workday.id, end_time=workday.end_time).update(
+            end_time=end_time, duration_seconds=duration, working_hours=format_duration(duration)
+        )
+        if not updated:
+            logger.warning(f"WorkDay {workday.id} was changed concurrently; not counted again")
+            return False
+        previous = (workday.duration_seconds or 0) if workday.end_time else 0
+        UserProfile.objects.filter(id=workday.user_profile_id).update(
+            total_working_time=F('total_working_time') + duration - previous
+        )
+        deltas = {}
+        if workday.end_time:
+            _collect(deltas, workday.user_profile_id, workday.start_time, workday.end_time, -1)
+        _collect(deltas, workday.user_profile_id, workday.start_time, end_time, 1)
+        _write(workday.user_profile_id, deltas)
+    workday.end_time, workday.duration_seconds, workday.working_hours = end_time, duration, format_duration(duration)
+    return True
+
+
+def remove_workday(workday):
+    """
+    Deletes a work day and takes an ended one back out of the totals.
+    """
+    with transaction.atomic():
+        workday.delete()
+        if workday.end_time:
+            UserProfile.objects.filter(id=workday.user_profile_id).update(
+                total_working_time=F('total_working_time') - (workday.duration_seconds or 0)
+            )
+            apply_to_rollups(workday.user_profile_id, workday.start_time, workday.end_time, sign=-1)
@@ -1,5 +1,11 @@
 """
-ASGI config for core project.
+ASGI config for backend project.
+
+Serve with an ASGI server (e.g. ``uvicorn backend.asgi:application``) to
+enable the team event streams at ``/api/teams/<id>/events/`` and the async
+card, team and profile reads (``ASGI_URLCONF``). Persistent connections
+are per thread and async views run their queries in short-lived threads,
+so ``DB_CONN_MAX_AGE`` defaults to 0 here.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
@@ -9,8 +15,28 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+# Read by the settings module, so it has to be set before django.setup()
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
+
+
+class AsyncReadsMixin:
+    """
+    Resolves requests against ``ASGI_URLCONF`` instead of ``ROOT_URLCONF``.
+    """
+
+    async def get_response_async(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await super().get_response_async(request)
+
+
+class AsyncReadsASGIHandler(AsyncReadsMixin, ASGIHandler):
+    pass
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+application = AsyncReadsASGIHandler()
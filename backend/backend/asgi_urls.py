@@ -0,0 +1,13 @@
+"""
+URL configuration used under ASGI (see backend/asgi.py): the async read
+views of api/async_urls.py, then everything in backend/urls.py.
+"""
+
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    *sync_urlpatterns,
+]
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CorsMiddleware should be FIRST
+    'api.profiling.RequestProfilingMiddleware',  # Server-Timing header and /api/_metrics/
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -41,6 +42,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'backend.urls'  # Ensure the correct path to URLs
+# Used by backend/asgi.py: ROOT_URLCONF plus async views for the hottest reads
+ASGI_URLCONF = 'backend.asgi_urls'
 
 TEMPLATES = [
     {
@@ -60,21 +63,55 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# ===========================
+# Database
+# ===========================
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request) and checked before reuse, so a connection the
+# server dropped is replaced instead of failing the request.
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.mysql')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'kanbanize_users',
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv('DB_NAME', 'kanbanize_users'),
 
-        'USER': 'root',
-        'PASSWORD': '123456',
-        'HOST': 'localhost',  # or your MySQL host
-        'PORT': '3306',       # default MySQL port
+        'USER': os.getenv('DB_USER', 'root'),
+        'PASSWORD': os.getenv('DB_PASSWORD', '123456'),
+        'HOST': os.getenv('DB_HOST', 'localhost'),  # or your MySQL host
+        'PORT': os.getenv('DB_PORT', '3306'),       # default MySQL port
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+        } if DB_ENGINE == 'django.db.backends.mysql' else {},
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
     }
 }
 
+# Optional read replica: safe-method API actions read from it (see
+# api/db_routing.py). Settings not given are taken from the primary, so two
+# SQLite files work locally:
+#   DB_ENGINE=django.db.backends.sqlite3 DB_NAME=primary.sqlite3 DB_REPLICA_NAME=replica.sqlite3
+# (migrate, then copy primary.sqlite3 to replica.sqlite3 to "replicate").
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Tests run against the primary only
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.db_routing.ReplicaRouter']
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+# After a write, the same user reads from the primary for this long, which
+# should cover the replication lag. The replica is only used with a cache
+# shared by all workers (see CACHE_SHARED).
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -106,6 +143,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Profile pictures larger than this are rejected while they are still uploading
+PROFILE_PIC_MAX_BYTES = 5 * 1024 * 1024
+
+# Pictures with more pixels are rejected before any thumbnail decodes them;
+# a few kilobytes of PNG can describe an image that takes gigabytes to decode
+PROFILE_PIC_MAX_PIXELS = int(os.getenv('PROFILE_PIC_MAX_PIXELS', str(4096 * 4096)))
+
+# Square thumbnail variants generated for every uploaded profile picture
+PROFILE_PIC_THUMBNAIL_SIZES = (64, 256)
+
+# Background threads that generate thumbnails
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -119,6 +169,158 @@ REST_FRAMEWORK = {
     ],
 }
 
+# ===========================
+# Cache
+# ===========================
+
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared cache
+# (Redis, Memcached) when running several workers
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'kanban'),
+    }
+}
+
+# Whether every worker process sees the same cache. Entries cached under team
+# versions (below) can only be kept long when a write in one worker retires
+# them in all of them. Guessed from the backend (locmem and dummy are per
+# process) unless set; set it to true for a single-process deployment
+CACHE_SHARED = {'true': True, 'false': False}.get(os.getenv('CACHE_SHARED', '').lower())
+# Without a shared cache, such entries (rosters, facets) are kept this many
+# seconds at most: a write elsewhere shows up in other workers within it
+PROCESS_CACHE_TIMEOUT = int(os.getenv('PROCESS_CACHE_TIMEOUT', '5'))
+
+# Seconds a user's cached team-membership set may be served without a signal
+# refresh (PROCESS_CACHE_TIMEOUT at most without a shared cache)
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv('MEMBERSHIP_CACHE_TIMEOUT', '300'))
+
+# Rosters are cached under a per-team version that changes on every membership
+# or member rename, so they can live long with a shared cache
+TEAM_ROSTER_CACHE_TIMEOUT = int(os.getenv('TEAM_ROSTER_CACHE_TIMEOUT', '86400'))
+
+# Board facets (card counts) are cached under the team and board versions,
+# so any card write or membership change retires them (with a shared cache;
+# PROCESS_CACHE_TIMEOUT caps this otherwise)
+TEAM_FACETS_CACHE_TIMEOUT = 86400
+
+# Rendered card lists (GET /api/cards/?team_id=) are cached as bytes under the
+# same versions, with a shared cache only. Boards with more cards (about 400
+# bytes each) are rendered per request: memcached, for one, refuses items
+# over 1 MB by default
+BOARD_SNAPSHOT_CACHE_TIMEOUT = 86400
+BOARD_SNAPSHOT_MAX_CARDS = int(os.getenv('BOARD_SNAPSHOT_MAX_CARDS', '20000'))
+# While one request rebuilds a snapshot the others poll for it, for at most
+# BOARD_SNAPSHOT_WAIT_TIMEOUT seconds before rendering the list themselves.
+# The lock outlives the slowest rebuild (about 1 s at BOARD_SNAPSHOT_MAX_CARDS)
+BOARD_SNAPSHOT_LOCK_TIMEOUT = int(os.getenv('BOARD_SNAPSHOT_LOCK_TIMEOUT', '60'))
+BOARD_SNAPSHOT_WAIT_TIMEOUT = 5
+BOARD_SNAPSHOT_POLL_INTERVAL = 0.05
+
+# ===========================
+# Firebase authentication caches
+# ===========================
+
+# Verified token claims are cached (keyed by token digest) until the token's exp
+FIREBASE_TOKEN_CACHE_SIZE = int(os.getenv('FIREBASE_TOKEN_CACHE_SIZE', '10000'))
+# uid -> User lookups are cached for this many seconds
+FIREBASE_USER_CACHE_SIZE = int(os.getenv('FIREBASE_USER_CACHE_SIZE', '10000'))
+FIREBASE_USER_CACHE_TTL = int(os.getenv('FIREBASE_USER_CACHE_TTL', '300'))
+# Dotted path to a replacement for firebase_admin.auth.verify_id_token (tests only)
+FIREBASE_TOKEN_VERIFIER = None
+# Threads verifying new tokens for the async (ASGI) views; requests beyond
+# this wait for a free thread without holding one
+FIREBASE_VERIFY_WORKERS = int(os.getenv('FIREBASE_VERIFY_WORKERS', '8'))
+
+# ===========================
+# Request profiling and metrics
+# ===========================
+
+# Per-request auth/db/serialize/render timings, returned as a Server-Timing
+# header and aggregated into the histograms served at /api/_metrics/
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'True').lower() == 'true'
+# Scrapers must send "Authorization: Bearer <METRICS_TOKEN>"; the metrics
+# endpoint answers 404 while it is unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# ===========================
+# Presence
+# ===========================
+
+# Last-seen timestamps are kept in memory and written to UserProfile.last_login
+# in one bulk_update every PRESENCE_FLUSH_INTERVAL seconds
+PRESENCE_FLUSH_INTERVAL = int(os.getenv('PRESENCE_FLUSH_INTERVAL', '30'))
+PRESENCE_RETENTION = 3600
+
+# ===========================
+# Card sync and bulk updates
+# ===========================
+
+# Deleted-card tombstones are kept this long; older cursors get a full resync
+CARD_TOMBSTONE_RETENTION_DAYS = 30
+
+# Upper bound on the number of changes accepted by POST /api/cards/bulk/
+CARD_BULK_MAX_CHANGES = 500
+
+# ===========================
+# Card search
+# ===========================
+
+# Dotted path to a search backend class; by default the database's own text
+# index is used (SQLite FTS5, MySQL FULLTEXT) and api.search's in-process
+# inverted index elsewhere
+CARD_SEARCH_BACKEND = os.getenv('CARD_SEARCH_BACKEND') or None
+# Results per search: the default and the most a client may ask for
+CARD_SEARCH_DEFAULT_LIMIT = 20
+CARD_SEARCH_MAX_LIMIT = 50
+# Only the newest matches are ranked, so a one-letter query on a huge board
+# stays fast; once the query narrows below this, ranking is exact
+CARD_SEARCH_CANDIDATES = 1000
+# Teams whose in-process index is kept in memory by the fallback backend
+CARD_SEARCH_FALLBACK_TEAMS = int(os.getenv('CARD_SEARCH_FALLBACK_TEAMS', '32'))
+
+# ===========================
+# Burndown
+# ===========================
+
+# Longest window served by /api/teams/{id}/burndown/
+BURNDOWN_MAX_DAYS = 366
+
+# ===========================
+# Board export / import
+# ===========================
+
+# Rows read per round trip on export and inserted per transaction on import
+BOARD_TRANSFER_BATCH_SIZE = 1000
+
+# ===========================
+# Timesheet export
+# ===========================
+
+# Work days fetched per database round trip (and CSV/NDJSON rows per streamed chunk)
+TIMESHEET_CHUNK_SIZE = 2000
+
+# ===========================
+# Real-time team events
+# ===========================
+
+# Broker that fans card/membership events out to /api/teams/<id>/events/ streams.
+# The in-process broker only reaches clients of the same worker; point this at a
+# shared implementation of api.realtime.Broker when running several workers
+REALTIME_BROKER = os.getenv('REALTIME_BROKER', 'api.realtime.InProcessBroker')
+
+# Seconds between keep-alive comments on an idle stream
+REALTIME_KEEPALIVE = 25
+
+# Events buffered per connection before a slow client is told to resync
+REALTIME_QUEUE_SIZE = 256
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+REALTIME_RETRY_MS = 3000
+
+# Lifetime of the single-use tickets browsers open event streams with
+REALTIME_TICKET_TTL = 30
+
 # ===========================
 # CORS Settings
 # ===========================